@@ -1,35 +1,100 @@
+from __future__ import annotations
+
 from datetime import date
-from typing import Dict, List, Tuple
+from io import BytesIO
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import ColumnDimension
+
+
+class Peer(NamedTuple):
+    name: str
+    ticker: str
+    selected: int
+    rationale: str
 
 
 PEERS = [
-    ("Aalberts", "AALB.AS", 1, "Closest diversified industrial technology peer"),
-    ("Dürr AG", "DUE.DE", 1, "Industrial automation/manufacturing systems exposure comparable to TKH"),
-    ("Basler", "BSL.DE", 1, "Direct machine vision hardware/software comparable"),
-    ("Cognex", "COGX", 1, "Global machine vision leader benchmark"),
-    ("Jenoptik", "JEN.DE", 1, "Photonics and optical systems overlap"),
-    ("Huber+Suhner", "HUBN.SW", 1, "Connectivity and industrial cabling exposure"),
-    ("NKT", "NKT.CO", 1, "Power/subsea cable and electrification exposure"),
-    ("Mersen", "MRN.PA", 1, "Electrical components and power management peer"),
-    ("Arcadis", "ARCAD.AS", 0, "Services-heavy model, less product/asset intensity"),
-    ("Fugro", "FUR.AS", 0, "Geo-data/offshore services, weaker industrial comparability"),
-    ("SBM Offshore", "SBMO.AS", 0, "Project/offshore leasing model not close to TKH"),
-    ("Vopak", "VPK.AS", 0, "Tank storage infrastructure, limited operating overlap"),
-    ("TKH (subject company)", "TWEKA.AS", 0, "Subject company reference (excluded from peer stats)"),
+    Peer("Aalberts", "AALB.AS", 1, "Closest diversified industrial technology peer"),
+    Peer("Dürr AG", "DUE.DE", 1, "Industrial automation/manufacturing systems exposure comparable to TKH"),
+    Peer("Basler", "BSL.DE", 1, "Direct machine vision hardware/software comparable"),
+    Peer("Cognex", "COGX", 1, "Global machine vision leader benchmark"),
+    Peer("Jenoptik", "JEN.DE", 1, "Photonics and optical systems overlap"),
+    Peer("Huber+Suhner", "HUBN.SW", 1, "Connectivity and industrial cabling exposure"),
+    Peer("NKT", "NKT.CO", 1, "Power/subsea cable and electrification exposure"),
+    Peer("Mersen", "MRN.PA", 1, "Electrical components and power management peer"),
+    Peer("Arcadis", "ARCAD.AS", 0, "Services-heavy model, less product/asset intensity"),
+    Peer("Fugro", "FUR.AS", 0, "Geo-data/offshore services, weaker industrial comparability"),
+    Peer("SBM Offshore", "SBMO.AS", 0, "Project/offshore leasing model not close to TKH"),
+    Peer("Vopak", "VPK.AS", 0, "Tank storage infrastructure, limited operating overlap"),
+    Peer("TKH (subject company)", "TWEKA.AS", 0, "Subject company reference (excluded from peer stats)"),
 ]
 
+HEADER_FILL = PatternFill("solid", fgColor="1F4E78")
+HEADER_FONT = Font(color="FFFFFF", bold=True)
+HEADER_ALIGN = Alignment(horizontal="center", vertical="center", wrap_text=True)
+SELECTED_FILL = PatternFill("solid", fgColor="E2F0D9")
+BOLD_FONT = Font(bold=True)
+
+# Blank-safe ratio used for every peer multiple, margin and leverage column.
+RATIO_FORMULA = '=IF(OR({den}="",{den}=0),"",{num}/{den})'
+# Valuation-block templates: implied EV, equity bridge and per-share value.
+PRODUCT_FORMULA = '=IF(OR({a}="",{b}=""),"",{a}*{b})'
+EQUITY_FORMULA = '=IF({ev}="","",{ev}-{net_debt}+{adjustments})'
+PER_SHARE_FORMULA = '=IF(OR({equity}="",{shares}=""),"",{equity}/{shares})'
+
+
+# Column letters for every column the generated sheets use (A..AZ); index 0 is unused.
+COLUMN_LETTERS = [""] + [get_column_letter(col) for col in range(1, 53)]
+
+
+def _column_letter(col: int) -> str:
+    if col < len(COLUMN_LETTERS):
+        return COLUMN_LETTERS[col]
+    return get_column_letter(col)
+
 
 def _cell(col: int, row: int) -> str:
-    return f"{get_column_letter(col)}{row}"
+    return f"{_column_letter(col)}{row}"
+
+
+def _set_column_widths(sheet, widths: Dict[int, float]) -> None:
+    dimensions = sheet.column_dimensions
+    for col, width in widths.items():
+        letter = _column_letter(col)
+        dimensions[letter] = ColumnDimension(sheet, index=letter, width=width)
+
+
+def _styled_cell(
+    sheet,
+    value: Any,
+    fill: PatternFill | None = None,
+    font: Font | None = None,
+    alignment: Alignment | None = None,
+) -> WriteOnlyCell:
+    cell = WriteOnlyCell(sheet, value=value)
+    if fill is not None:
+        cell.fill = fill
+    if font is not None:
+        cell.font = font
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
 
 
-def _apply_row_fill(sheet, row: int, max_col: int, fill: PatternFill) -> None:
-    for col in range(1, max_col + 1):
-        sheet.cell(row=row, column=col).fill = fill
+def _append_row(sheet, rows_written: int, row: int, values: Sequence[Any]) -> int:
+    """Append ``values`` as sheet row ``row``, padding skipped rows; returns the new row count.
+
+    Write-only sheets can only grow by ``append``, so blank spacer rows are emitted explicitly.
+    """
+    for _ in range(rows_written + 1, row):
+        sheet.append([])
+    sheet.append(values)
+    return row
 
 
 def main() -> None:
@@ -70,14 +135,10 @@ def main() -> None:
     tail_columns = ["Net Debt/EBITDA"]
     margin_group = ("EBITDA Margin", years)
 
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.title = "Peer_Table"
-
-    header_fill = PatternFill("solid", fgColor="1F4E78")
-    header_font = Font(color="FFFFFF", bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    selected_fill = PatternFill("solid", fgColor="E2F0D9")
+    # Write-only mode streams each appended row straight to the sheet XML, so every
+    # sheet below is emitted strictly top to bottom.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title="Peer_Table")
 
     row_1 = 1
     row_2 = 2
@@ -85,119 +146,130 @@ def main() -> None:
     current_col = 1
     base_map: Dict[str, int] = {}
     group_map: Dict[Tuple[str, int], int] = {}
+    header_row_1: List[Any] = []
+    header_row_2: List[Any] = []
+    merge_ranges: List[str] = []
 
     for label in base_columns:
-        sheet.cell(row=row_1, column=current_col, value=label)
-        sheet.merge_cells(start_row=row_1, start_column=current_col, end_row=row_2, end_column=current_col)
+        header_row_1.append(label)
+        header_row_2.append(None)
+        merge_ranges.append(f"{_cell(current_col, row_1)}:{_cell(current_col, row_2)}")
         base_map[label] = current_col
         current_col += 1
 
     for group_label, group_years in operating_groups + multiple_groups:
         start_col = current_col
-        sheet.cell(row=row_1, column=start_col, value=group_label)
         for year in group_years:
-            sheet.cell(row=row_2, column=current_col, value=str(year))
+            header_row_1.append(group_label if current_col == start_col else None)
+            header_row_2.append(str(year))
             group_map[(group_label, year)] = current_col
             current_col += 1
-        sheet.merge_cells(start_row=row_1, start_column=start_col, end_row=row_1, end_column=current_col - 1)
+        merge_ranges.append(f"{_cell(start_col, row_1)}:{_cell(current_col - 1, row_1)}")
 
     for label in tail_columns:
-        sheet.cell(row=row_1, column=current_col, value=label)
-        sheet.merge_cells(start_row=row_1, start_column=current_col, end_row=row_2, end_column=current_col)
+        header_row_1.append(label)
+        header_row_2.append(None)
+        merge_ranges.append(f"{_cell(current_col, row_1)}:{_cell(current_col, row_2)}")
         base_map[label] = current_col
         current_col += 1
 
     margin_label, margin_years = margin_group
     start_col = current_col
-    sheet.cell(row=row_1, column=start_col, value=margin_label)
     for year in margin_years:
-        sheet.cell(row=row_2, column=current_col, value=str(year))
+        header_row_1.append(margin_label if current_col == start_col else None)
+        header_row_2.append(str(year))
         group_map[(margin_label, year)] = current_col
         current_col += 1
-    sheet.merge_cells(start_row=row_1, start_column=start_col, end_row=row_1, end_column=current_col - 1)
+    merge_ranges.append(f"{_cell(start_col, row_1)}:{_cell(current_col - 1, row_1)}")
 
     last_col = current_col - 1
+    # Write-only sheets cannot merge_cells(); register the collected ranges through the public API.
+    for ref in merge_ranges:
+        sheet.merged_cells.add(ref)
 
-    for row in range(row_1, row_2 + 1):
-        for col in range(1, last_col + 1):
-            cell = sheet.cell(row=row, column=col)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-
+    # Panes and column widths are serialised ahead of the first row in write-only mode.
     sheet.freeze_panes = "A3"
 
+    column_widths = {
+        1: 18,
+        2: 12,
+        3: 14,
+        4: 46,
+        5: 10,
+        6: 14,
+        7: 18,
+        8: 20,
+        9: 18,
+        10: 10,
+        11: 18,
+        12: 20,
+        13: 22,
+        14: 18,
+    }
+    _set_column_widths(sheet, column_widths)
+
+    rows_written = 0
+    for row, header_values in ((row_1, header_row_1), (row_2, header_row_2)):
+        header_cells = [
+            _styled_cell(sheet, value, fill=HEADER_FILL, font=HEADER_FONT, alignment=HEADER_ALIGN)
+            for value in header_values
+        ]
+        rows_written = _append_row(sheet, rows_written, row, header_cells)
+
     data_start_row = 3
-    for offset, (name, ticker, selected, rationale) in enumerate(PEERS):
+    # Peer fields are laid out in the same order as the first four base columns.
+    identity_indexes = tuple(
+        base_map[label] - 1 for label in ("Company", "Ticker", "Selected (1/0)", "Selection rationale")
+    )
+    # Per-year column positions, resolved once for every peer row.
+    year_columns = [
+        tuple(
+            group_map[(label, year)]
+            for label in ("Revenue (CCY m)", "EBITDA (CCY m)", "EBIT (CCY m)", "EV/Sales", "EV/EBITDA", "EV/EBIT", margin_label)
+        )
+        for year in years
+    ]
+    latest_ebitda_col = group_map[("EBITDA (CCY m)", latest_year)]
+    net_debt_ebitda_col = base_map["Net Debt/EBITDA"]
+    for offset, peer in enumerate(PEERS):
         row = data_start_row + offset
-        sheet.cell(row=row, column=base_map["Company"], value=name)
-        sheet.cell(row=row, column=base_map["Ticker"], value=ticker)
-        sheet.cell(row=row, column=base_map["Selected (1/0)"], value=selected)
-        sheet.cell(row=row, column=base_map["Selection rationale"], value=rationale)
+        row_values: List[Any] = [None] * last_col
+        for index, value in zip(identity_indexes, peer):
+            row_values[index] = value
 
-        ev_col = base_map["Enterprise Value (CCY m)"]
-        net_debt_col = base_map["Net Debt (CCY m)"]
-
-        for year in years:
-            revenue_col = group_map[("Revenue (CCY m)", year)]
-            ebitda_col = group_map[("EBITDA (CCY m)", year)]
-            ebit_col = group_map[("EBIT (CCY m)", year)]
-            ev_sales_col = group_map[("EV/Sales", year)]
-            ev_ebitda_col = group_map[("EV/EBITDA", year)]
-            ev_ebit_col = group_map[("EV/EBIT", year)]
-            margin_col = group_map[(margin_label, year)]
+        ev_cell = _cell(base_map["Enterprise Value (CCY m)"], row)
+        net_debt_cell = _cell(base_map["Net Debt (CCY m)"], row)
 
+        for revenue_col, ebitda_col, ebit_col, ev_sales_col, ev_ebitda_col, ev_ebit_col, margin_col in year_columns:
             revenue_cell = _cell(revenue_col, row)
             ebitda_cell = _cell(ebitda_col, row)
             ebit_cell = _cell(ebit_col, row)
-            ev_cell = _cell(ev_col, row)
-
-            sheet.cell(
-                row=row,
-                column=ev_sales_col,
-                value=f"=IF(OR({revenue_cell}=\"\",{revenue_cell}=0),\"\",{ev_cell}/{revenue_cell})",
-            )
-            sheet.cell(
-                row=row,
-                column=ev_ebitda_col,
-                value=f"=IF(OR({ebitda_cell}=\"\",{ebitda_cell}=0),\"\",{ev_cell}/{ebitda_cell})",
-            )
-            sheet.cell(
-                row=row,
-                column=ev_ebit_col,
-                value=f"=IF(OR({ebit_cell}=\"\",{ebit_cell}=0),\"\",{ev_cell}/{ebit_cell})",
-            )
-            sheet.cell(
-                row=row,
-                column=margin_col,
-                value=f"=IF(OR({revenue_cell}=\"\",{revenue_cell}=0),\"\",{ebitda_cell}/{revenue_cell})",
-            )
-
-        latest_ebitda_col = group_map[("EBITDA (CCY m)", latest_year)]
-        net_debt_ebitda_col = base_map["Net Debt/EBITDA"]
+
+            row_values[ev_sales_col - 1] = RATIO_FORMULA.format(num=ev_cell, den=revenue_cell)
+            row_values[ev_ebitda_col - 1] = RATIO_FORMULA.format(num=ev_cell, den=ebitda_cell)
+            row_values[ev_ebit_col - 1] = RATIO_FORMULA.format(num=ev_cell, den=ebit_cell)
+            row_values[margin_col - 1] = RATIO_FORMULA.format(num=ebitda_cell, den=revenue_cell)
+
         latest_ebitda_cell = _cell(latest_ebitda_col, row)
-        net_debt_cell = _cell(net_debt_col, row)
-        sheet.cell(
-            row=row,
-            column=net_debt_ebitda_col,
-            value=f"=IF(OR({latest_ebitda_cell}=\"\",{latest_ebitda_cell}=0),\"\",{net_debt_cell}/{latest_ebitda_cell})",
-        )
+        row_values[net_debt_ebitda_col - 1] = RATIO_FORMULA.format(num=net_debt_cell, den=latest_ebitda_cell)
 
-        if selected == 1:
-            _apply_row_fill(sheet, row, last_col, selected_fill)
+        if peer.selected == 1:
+            # Blank cells are wrapped too so the highlight spans the whole row.
+            row_values = [_styled_cell(sheet, value, fill=SELECTED_FILL) for value in row_values]
+        rows_written = _append_row(sheet, rows_written, row, row_values)
 
     data_end_row = data_start_row + len(PEERS) - 1
 
-    sheet.auto_filter.ref = f"A2:{get_column_letter(last_col)}{data_end_row}"
+    sheet.auto_filter.ref = f"A2:{_column_letter(last_col)}{data_end_row}"
 
     summary_start = data_end_row + 2
     avg_row = summary_start
     median_row = summary_start + 1
 
-    sheet.cell(row=avg_row, column=1, value="Selected peers average")
-    sheet.cell(row=median_row, column=1, value="Selected peers median")
-    sheet.cell(row=avg_row, column=1).font = Font(bold=True)
-    sheet.cell(row=median_row, column=1).font = Font(bold=True)
+    avg_values: List[Any] = [None] * last_col
+    median_values: List[Any] = [None] * last_col
+    avg_values[0] = _styled_cell(sheet, "Selected peers average", font=BOLD_FONT)
+    median_values[0] = _styled_cell(sheet, "Selected peers median", font=BOLD_FONT)
 
     selected_range = f"{_cell(base_map['Selected (1/0)'], data_start_row)}:{_cell(base_map['Selected (1/0)'], data_end_row)}"
 
@@ -207,23 +279,23 @@ def main() -> None:
             multiple_columns.append(group_map[(label, year)])
 
     for col in multiple_columns:
-        col_letter = get_column_letter(col)
+        col_letter = _column_letter(col)
         range_ref = f"{col_letter}{data_start_row}:{col_letter}{data_end_row}"
         avg_formula = f"=IFERROR(AVERAGEIF({selected_range},1,{range_ref}),\"\")"
         median_formula = (
             f"=IFERROR(MEDIAN(FILTER({range_ref},({selected_range}=1)*({range_ref}<>\"\"))),\"\")"
         )
-        sheet.cell(row=avg_row, column=col, value=avg_formula)
-        sheet.cell(row=median_row, column=col, value=median_formula)
+        avg_values[col - 1] = avg_formula
+        median_values[col - 1] = median_formula
+
+    rows_written = _append_row(sheet, rows_written, avg_row, avg_values)
+    rows_written = _append_row(sheet, rows_written, median_row, median_values)
 
     inputs_start = median_row + 3
-    sheet.cell(row=inputs_start, column=1, value="TKH Inputs")
-    sheet.cell(row=inputs_start, column=1).font = Font(bold=True)
+    rows_written = _append_row(sheet, rows_written, inputs_start, [_styled_cell(sheet, "TKH Inputs", font=BOLD_FONT)])
 
     input_header_row = inputs_start + 1
-    sheet.cell(row=input_header_row, column=1, value="Metric")
-    sheet.cell(row=input_header_row, column=2, value=str(prior_year))
-    sheet.cell(row=input_header_row, column=3, value=str(latest_year))
+    rows_written = _append_row(sheet, rows_written, input_header_row, ["Metric", str(prior_year), str(latest_year)])
 
     input_rows = [
         ("Revenue (CCY m)", "revenue"),
@@ -234,38 +306,34 @@ def main() -> None:
         ("Shares Outstanding (m)", "shares"),
     ]
 
-    input_cells: Dict[str, Dict[str, str]] = {}
+    # Yearly TKH metrics keyed by (metric, year); single-value inputs keyed by name.
+    metric_cells: Dict[Tuple[str, int], str] = {}
+    input_cells: Dict[str, str] = {}
     ticker_col = base_map["Ticker"]
     tkh_match = f"MATCH(\"TWEKA.AS\",{_cell(ticker_col, data_start_row)}:{_cell(ticker_col, data_end_row)},0)"
     for idx, (label, key) in enumerate(input_rows, start=1):
         row = input_header_row + idx
-        sheet.cell(row=row, column=1, value=label)
+        input_values: List[Any] = [label, None, None]
         if key in {"revenue", "ebitda", "ebit"}:
-            input_cells[key] = {
-                "prior": _cell(2, row),
-                "latest": _cell(3, row),
-            }
             for year_col, year in zip((2, 3), (prior_year, latest_year)):
+                metric_cells[(key, year)] = _cell(year_col, row)
                 source_col = group_map[(label, year)]
                 source_range = f"{_cell(source_col, data_start_row)}:{_cell(source_col, data_end_row)}"
-                sheet.cell(
-                    row=row,
-                    column=year_col,
-                    value=f"=IFERROR(INDEX({source_range},{tkh_match}),\"\")",
-                )
+                input_values[year_col - 1] = f"=IFERROR(INDEX({source_range},{tkh_match}),\"\")"
         else:
-            cell_ref = _cell(3, row)
-            input_cells[key] = {"value": cell_ref}
+            input_cells[key] = _cell(3, row)
             if key == "adjustments":
-                sheet.cell(row=row, column=3, value=0)
+                input_values[2] = 0
             if key == "net_debt":
                 source_col = base_map["Net Debt (CCY m)"]
                 source_range = f"{_cell(source_col, data_start_row)}:{_cell(source_col, data_end_row)}"
-                sheet.cell(row=row, column=3, value=f"=IFERROR(INDEX({source_range},{tkh_match}),\"\")")
+                input_values[2] = f"=IFERROR(INDEX({source_range},{tkh_match}),\"\")"
+        rows_written = _append_row(sheet, rows_written, row, input_values)
 
     valuation_start = input_header_row + len(input_rows) + 3
-    sheet.cell(row=valuation_start, column=1, value="TKH valuation (Selected peers)")
-    sheet.cell(row=valuation_start, column=1).font = Font(bold=True)
+    rows_written = _append_row(
+        sheet, rows_written, valuation_start, [_styled_cell(sheet, "TKH valuation (Selected peers)", font=BOLD_FONT)]
+    )
 
     valuation_header_row = valuation_start + 1
     valuation_headers = [
@@ -285,8 +353,7 @@ def main() -> None:
         "Per Share (Median)",
     ]
 
-    for col, header in enumerate(valuation_headers, start=1):
-        sheet.cell(row=valuation_header_row, column=col, value=header)
+    rows_written = _append_row(sheet, rows_written, valuation_header_row, valuation_headers)
 
     valuation_rows: List[Tuple[str, str, str]] = []
     for label, metric_key in [
@@ -297,81 +364,41 @@ def main() -> None:
         for year in years:
             valuation_rows.append((label, str(year), metric_key))
 
-    net_debt_ref = input_cells["net_debt"]["value"]
-    adjustments_ref = input_cells["adjustments"]["value"]
-    shares_ref = input_cells["shares"]["value"]
+    net_debt_ref = input_cells["net_debt"]
+    adjustments_ref = input_cells["adjustments"]
+    shares_ref = input_cells["shares"]
 
     for idx, (multiple_label, year_label, metric_key) in enumerate(valuation_rows, start=1):
         row = valuation_header_row + idx
-        sheet.cell(row=row, column=1, value=multiple_label)
-        sheet.cell(row=row, column=2, value=year_label)
 
         year = int(year_label)
         avg_multiple_cell = _cell(group_map[(multiple_label, year)], avg_row)
         median_multiple_cell = _cell(group_map[(multiple_label, year)], median_row)
-        metric_cell = input_cells[metric_key]["prior" if year == prior_year else "latest"]
-
-        sheet.cell(row=row, column=3, value=f"={avg_multiple_cell}")
-        sheet.cell(row=row, column=4, value=f"={median_multiple_cell}")
-        sheet.cell(row=row, column=5, value=f"={metric_cell}")
-
-        avg_implied_ev = _cell(6, row)
-        median_implied_ev = _cell(7, row)
-        avg_equity = _cell(10, row)
-        median_equity = _cell(11, row)
-
-        sheet.cell(
-            row=row,
-            column=6,
-            value=f"=IF(OR(C{row}=\"\",E{row}=\"\"),\"\",C{row}*E{row})",
-        )
-        sheet.cell(
-            row=row,
-            column=7,
-            value=f"=IF(OR(D{row}=\"\",E{row}=\"\"),\"\",D{row}*E{row})",
-        )
-        sheet.cell(row=row, column=8, value=f"={net_debt_ref}")
-        sheet.cell(row=row, column=9, value=f"={adjustments_ref}")
-        sheet.cell(
-            row=row,
-            column=10,
-            value=f"=IF({avg_implied_ev}=\"\",\"\",{avg_implied_ev}-H{row}+I{row})",
-        )
-        sheet.cell(
-            row=row,
-            column=11,
-            value=f"=IF({median_implied_ev}=\"\",\"\",{median_implied_ev}-H{row}+I{row})",
-        )
-        sheet.cell(row=row, column=12, value=f"={shares_ref}")
-        sheet.cell(
-            row=row,
-            column=13,
-            value=f"=IF(OR({avg_equity}=\"\",L{row}=\"\"),\"\",{avg_equity}/L{row})",
-        )
-        sheet.cell(
-            row=row,
-            column=14,
-            value=f"=IF(OR({median_equity}=\"\",L{row}=\"\"),\"\",{median_equity}/L{row})",
-        )
-
-    column_widths = {
-        1: 18,
-        2: 12,
-        3: 14,
-        4: 46,
-        5: 10,
-        6: 14,
-        7: 18,
-        8: 20,
-        9: 18,
-        10: 10,
-        11: 18,
-        12: 20,
-        13: 22,
-        14: 18,
-    }
-    for col, width in column_widths.items():
-        sheet.column_dimensions[get_column_letter(col)].width = width
+        metric_cell = metric_cells[(metric_key, year)]
+
+        avg_multiple, median_multiple, metric = _cell(3, row), _cell(4, row), _cell(5, row)
+        avg_implied_ev, median_implied_ev = _cell(6, row), _cell(7, row)
+        net_debt, adjustments = _cell(8, row), _cell(9, row)
+        avg_equity, median_equity = _cell(10, row), _cell(11, row)
+        shares = _cell(12, row)
+
+        valuation_values = [
+            multiple_label,
+            year_label,
+            f"={avg_multiple_cell}",
+            f"={median_multiple_cell}",
+            f"={metric_cell}",
+            PRODUCT_FORMULA.format(a=avg_multiple, b=metric),
+            PRODUCT_FORMULA.format(a=median_multiple, b=metric),
+            f"={net_debt_ref}",
+            f"={adjustments_ref}",
+            EQUITY_FORMULA.format(ev=avg_implied_ev, net_debt=net_debt, adjustments=adjustments),
+            EQUITY_FORMULA.format(ev=median_implied_ev, net_debt=net_debt, adjustments=adjustments),
+            f"={shares_ref}",
+            PER_SHARE_FORMULA.format(equity=avg_equity, shares=shares),
+            PER_SHARE_FORMULA.format(equity=median_equity, shares=shares),
+        ]
+        rows_written = _append_row(sheet, rows_written, row, valuation_values)
 
     instructions = workbook.create_sheet(title="Instructions")
     instructions_data = [
@@ -387,11 +414,12 @@ def main() -> None:
         ],
         ["Selection result", "Rows with Selected=1 drive the peer summary and valuation block."],
     ]
-    for row, values in enumerate(instructions_data, start=1):
-        for col, value in enumerate(values, start=1):
-            instructions.cell(row=row, column=col, value=value)
+    for values in instructions_data:
+        instructions.append(values)
 
     wacc = workbook.create_sheet(title="WACC_Model")
+    _set_column_widths(wacc, {1: 28, **{col: 18 for col in range(2, 9)}})
+
     wacc_headers = [
         "Company",
         "Ticker",
@@ -402,30 +430,26 @@ def main() -> None:
         "Debt/Equity",
         "Unlevered Beta",
     ]
-    for col, header in enumerate(wacc_headers, start=1):
-        wacc.cell(row=1, column=col, value=header).font = Font(bold=True)
+    wacc.append([_styled_cell(wacc, header, font=BOLD_FONT) for header in wacc_headers])
+    wacc_rows_written = 1
 
-    for idx, _ in enumerate(PEERS, start=0):
+    input_start = len(PEERS) + 4
+    tax_rate_cell = f"B{input_start + 4}"
+    # (WACC column index, Peer_Table column) for the headers linked straight to the peer table.
+    linked_columns = [(index, base_map[header]) for index, header in enumerate(wacc_headers) if header in base_map]
+    for idx in range(len(PEERS)):
         peer_row = data_start_row + idx
         wacc_row = 2 + idx
-        for col, header in enumerate(wacc_headers, start=1):
-            if header in base_map:
-                source_col = base_map[header]
-                wacc.cell(row=wacc_row, column=col, value=f"=Peer_Table!{_cell(source_col, peer_row)}")
-        wacc.cell(row=wacc_row, column=1, value=f"=Peer_Table!{_cell(base_map['Company'], peer_row)}")
-        wacc.cell(row=wacc_row, column=2, value=f"=Peer_Table!{_cell(base_map['Ticker'], peer_row)}")
-        wacc.cell(row=wacc_row, column=3, value=f"=Peer_Table!{_cell(base_map['Selected (1/0)'], peer_row)}")
-        wacc.cell(row=wacc_row, column=4, value=f"=Peer_Table!{_cell(base_map['Equity Beta'], peer_row)}")
-        wacc.cell(row=wacc_row, column=5, value=f"=Peer_Table!{_cell(base_map['Net Debt (CCY m)'], peer_row)}")
-        wacc.cell(row=wacc_row, column=6, value=f"=Peer_Table!{_cell(base_map['Market Cap (CCY m)'], peer_row)}")
-        wacc.cell(
-            row=wacc_row,
-            column=7,
-            value=f"=IF(OR(F{wacc_row}=\"\",F{wacc_row}=0,E{wacc_row}=\"\"),\"\",E{wacc_row}/F{wacc_row})",
-        )
-
-    input_start = len(PEERS) + 4
-    wacc.cell(row=input_start, column=1, value="WACC Inputs").font = Font(bold=True)
+        wacc_values: List[Any] = [None] * len(wacc_headers)
+        for index, source_col in linked_columns:
+            wacc_values[index] = f"=Peer_Table!{_cell(source_col, peer_row)}"
+        wacc_values[6] = f"=IF(OR(F{wacc_row}=\"\",F{wacc_row}=0,E{wacc_row}=\"\"),\"\",E{wacc_row}/F{wacc_row})"
+        wacc_values[7] = f"=IF(OR(D{wacc_row}=\"\",G{wacc_row}=\"\"),\"\",D{wacc_row}/(1+(1-{tax_rate_cell})*G{wacc_row}))"
+        wacc_rows_written = _append_row(wacc, wacc_rows_written, wacc_row, wacc_values)
+
+    wacc_rows_written = _append_row(
+        wacc, wacc_rows_written, input_start, [_styled_cell(wacc, "WACC Inputs", font=BOLD_FONT)]
+    )
     inputs = [
         ("Risk-free rate", 0.03),
         ("Market risk premium", 0.045),
@@ -436,52 +460,40 @@ def main() -> None:
     ]
     for idx, (label, default) in enumerate(inputs, start=1):
         row = input_start + idx
-        wacc.cell(row=row, column=1, value=label)
-        wacc.cell(row=row, column=2, value=default)
+        wacc_rows_written = _append_row(wacc, wacc_rows_written, row, [label, default])
 
     summary_start = input_start + len(inputs) + 2
-    wacc.cell(row=summary_start, column=1, value="Selected peers beta summary").font = Font(bold=True)
-    wacc.cell(row=summary_start + 1, column=1, value="Average equity beta")
-    wacc.cell(row=summary_start + 2, column=1, value="Median equity beta")
-    wacc.cell(row=summary_start + 3, column=1, value="Average unlevered beta")
-    wacc.cell(row=summary_start + 4, column=1, value="Median unlevered beta")
-
     selected_range_wacc = f"C2:C{len(PEERS)+1}"
     equity_beta_range = f"D2:D{len(PEERS)+1}"
-    unlevered_start_row = 2
-    tax_rate_cell = f"B{input_start + 4}"
-    for idx in range(len(PEERS)):
-        row = unlevered_start_row + idx
-        wacc.cell(
-            row=row,
-            column=8,
-            value=f"=IF(OR(D{row}=\"\",G{row}=\"\"),\"\",D{row}/(1+(1-{tax_rate_cell})*G{row}))",
-        )
-
     unlevered_range = f"H2:H{len(PEERS)+1}"
-    wacc.cell(
-        row=summary_start + 1,
-        column=2,
-        value=f"=IFERROR(AVERAGEIF({selected_range_wacc},1,{equity_beta_range}),\"\")",
-    )
-    wacc.cell(
-        row=summary_start + 2,
-        column=2,
-        value=f"=IFERROR(MEDIAN(FILTER({equity_beta_range},({selected_range_wacc}=1)*({equity_beta_range}<>\"\"))),\"\")",
-    )
-    wacc.cell(
-        row=summary_start + 3,
-        column=2,
-        value=f"=IFERROR(AVERAGEIF({selected_range_wacc},1,{unlevered_range}),\"\")",
-    )
-    wacc.cell(
-        row=summary_start + 4,
-        column=2,
-        value=f"=IFERROR(MEDIAN(FILTER({unlevered_range},({selected_range_wacc}=1)*({unlevered_range}<>\"\"))),\"\")",
+    summary_rows = [
+        (
+            "Average equity beta",
+            f"=IFERROR(AVERAGEIF({selected_range_wacc},1,{equity_beta_range}),\"\")",
+        ),
+        (
+            "Median equity beta",
+            f"=IFERROR(MEDIAN(FILTER({equity_beta_range},({selected_range_wacc}=1)*({equity_beta_range}<>\"\"))),\"\")",
+        ),
+        (
+            "Average unlevered beta",
+            f"=IFERROR(AVERAGEIF({selected_range_wacc},1,{unlevered_range}),\"\")",
+        ),
+        (
+            "Median unlevered beta",
+            f"=IFERROR(MEDIAN(FILTER({unlevered_range},({selected_range_wacc}=1)*({unlevered_range}<>\"\"))),\"\")",
+        ),
+    ]
+    wacc_rows_written = _append_row(
+        wacc, wacc_rows_written, summary_start, [_styled_cell(wacc, "Selected peers beta summary", font=BOLD_FONT)]
     )
+    for idx, (label, formula) in enumerate(summary_rows, start=1):
+        wacc_rows_written = _append_row(wacc, wacc_rows_written, summary_start + idx, [label, formula])
 
     calc_start = summary_start + 6
-    wacc.cell(row=calc_start, column=1, value="WACC Calculation").font = Font(bold=True)
+    wacc_rows_written = _append_row(
+        wacc, wacc_rows_written, calc_start, [_styled_cell(wacc, "WACC Calculation", font=BOLD_FONT)]
+    )
     calc_rows = [
         ("Relevered beta", f"=B{summary_start + 3}*(1+(1-B{input_start + 4})*B{input_start + 6})"),
         ("Cost of equity", f"=B{input_start + 1}+B{input_start + 2}*B{calc_start + 1}+B{input_start + 3}"),
@@ -495,15 +507,13 @@ def main() -> None:
     ]
     for idx, (label, formula) in enumerate(calc_rows, start=1):
         row = calc_start + idx
-        wacc.cell(row=row, column=1, value=label)
-        wacc.cell(row=row, column=2, value=formula)
-
-    wacc.column_dimensions["A"].width = 28
-    wacc.column_dimensions["B"].width = 18
-    for col in range(3, 9):
-        wacc.column_dimensions[get_column_letter(col)].width = 18
+        wacc_rows_written = _append_row(wacc, wacc_rows_written, row, [label, formula])
 
-    workbook.save("TKH_Peer_Analysis.xlsx")
+    # Serialise in memory first so the output file is written in one go.
+    buffer = BytesIO()
+    workbook.save(buffer)
+    with open("TKH_Peer_Analysis.xlsx", "wb") as handle:
+        handle.write(buffer.getvalue())
 
 
 if __name__ == "__main__":
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable
+import os
+import random
+import shelve
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, TypeVar
 
 import pandas as pd
 import yfinance as yf
+from yfinance.exceptions import YFRateLimitError
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 
@@ -15,7 +22,26 @@ HEADER_ROW_1 = 1
 HEADER_ROW_2 = 2
 DATA_START_ROW = 3
 
+# Concurrent Yahoo requests; each ticker needs several round-trips.
+FETCH_WORKERS = 8
+# Symbols per yf.download call; Yahoo's chart endpoint handles about 20 per request.
+DOWNLOAD_BATCH_SIZE = 20
+# Retries for Yahoo rate-limit (429) responses: exponential backoff with jitter.
+RATE_LIMIT_ATTEMPTS = 4
+RATE_LIMIT_BASE_DELAY = 2.0
+# Per-day cache of Yahoo fundamentals (shelve database in the working directory).
+YAHOO_CACHE_FILE = "yahoo_cache"
+# Set to 1 to bypass cached entries and re-download everything.
+YAHOO_REFRESH_ENV = "YAHOO_REFRESH"
+# Set to 1 to continue from today's filled workbook and skip peer rows that are already complete.
+YAHOO_INCREMENTAL_ENV = "YAHOO_INCREMENTAL"
+# Optional fixed EUR rates, e.g. "USD=0.92,GBP=1.17"; listed currencies skip the Yahoo FX lookup.
+YAHOO_FX_ENV = "YAHOO_FX_EUR"
+
 MISSING_OPERATING_FILL = PatternFill("solid", fgColor="FFF2CC")
+# Row fills used by build_peer_workbook.py; restored when an incremental run fills a previously missing value.
+SELECTED_FILL = PatternFill("solid", fgColor="E2F0D9")
+NO_FILL = PatternFill()
 
 # Map “your” tickers -> Yahoo tickers when needed
 TICKER_MAP = {
@@ -49,25 +75,73 @@ CASH_LABELS = [
     "Cash And Cash Equivalents Including Short Term Investments",
 ]
 
+# Lower-cased once at import; _find_row_label matches these against _row_label_map keys.
+REVENUE_KEYS = tuple(label.lower() for label in REVENUE_LABELS)
+EBIT_KEYS = tuple(label.lower() for label in EBIT_LABELS)
+EBITDA_KEYS = tuple(label.lower() for label in EBITDA_LABELS)
+DA_KEYS = tuple(label.lower() for label in DA_LABELS)
+TOTAL_DEBT_KEYS = tuple(label.lower() for label in TOTAL_DEBT_LABELS)
+DEBT_COMPONENT_KEYS = tuple(label.lower() for label in DEBT_COMPONENT_LABELS)
+CASH_KEYS = tuple(label.lower() for label in CASH_LABELS)
+
 
 def _map_ticker(ticker: str) -> str:
-    return TICKER_MAP.get(ticker.strip(), ticker.strip())
+    """Yahoo symbol for an already-stripped sheet ticker."""
+    return TICKER_MAP.get(ticker, ticker)
 
 
 def _to_ccy_m(value: Any) -> float | None:
-    """Convert absolute currency units -> currency millions."""
+    """Convert absolute currency units -> currency millions (NaN counts as missing)."""
+    if isinstance(value, (int, float)):
+        # value == value is False only for NaN
+        return value / 1_000_000 if value == value else None
     if value in (None, ""):
         return None
     try:
-        return float(value) / 1_000_000
+        number = float(value)
     except (TypeError, ValueError):
         return None
+    return number / 1_000_000 if number == number else None
+
+
+def _to_eur(value: float | None, fx_rate: float | None) -> float | None:
+    """Convert a CCY amount to EUR; None when either side is unavailable."""
+    if value is None or fx_rate is None:
+        return None
+    return value * fx_rate
+
+
+def _info_price(info: Dict[str, Any]) -> float | None:
+    """Quote carried in the get_info() payload, if any."""
+    for key in ("regularMarketPrice", "currentPrice", "previousClose"):
+        value = info.get(key)
+        if isinstance(value, (int, float)) and value == value:
+            return float(value)
+    return None
+
+
+T = TypeVar("T")
+
+
+def _with_rate_limit_retry(fetch: Callable[[], T], what: str) -> T:
+    """Run a Yahoo call, backing off and retrying when Yahoo answers with a rate limit."""
+    attempt = 1
+    while True:
+        try:
+            return fetch()
+        except YFRateLimitError:
+            if attempt >= RATE_LIMIT_ATTEMPTS:
+                raise
+            delay = RATE_LIMIT_BASE_DELAY * 2 ** (attempt - 1) + random.uniform(0, RATE_LIMIT_BASE_DELAY)
+            print(f"{what}: rate limited by Yahoo, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
 
 
 def _last_close_price(tkr: yf.Ticker) -> float | None:
     """Get last close price from recent trading days (more robust than info)."""
     try:
-        hist = tkr.history(period="5d")
+        hist = _with_rate_limit_retry(lambda: tkr.history(period="5d"), f"{tkr.ticker} history")
         if hist is None or hist.empty:
             return None
         close = hist["Close"].dropna()
@@ -78,41 +152,85 @@ def _last_close_price(tkr: yf.Ticker) -> float | None:
         return None
 
 
-def _find_row_label(index: Iterable[Any], labels: Iterable[str]) -> Any | None:
-    """Find best-matching row label in a yfinance financials dataframe index."""
-    label_map = {str(label).lower(): label for label in index}
-    for candidate in labels:
-        key = candidate.lower()
+def _row_label_map(index: Iterable[Any]) -> Dict[str, Any]:
+    """Lower-cased label -> original label, built once per statement and reused across lookups."""
+    return {str(label).lower(): label for label in index}
+
+
+def _find_row_label(
+    index: Iterable[Any],
+    keys: Iterable[str],
+    label_map: Dict[str, Any] | None = None,
+) -> Any | None:
+    """Find best-matching row label in a yfinance financials dataframe index (keys are lower-cased)."""
+    if label_map is None:
+        label_map = _row_label_map(index)
+    for key in keys:
         if key in label_map:
             return label_map[key]
     return None
 
 
-def _extract_metric_by_year(financials: pd.DataFrame, labels: Iterable[str]) -> Dict[int, float]:
+def _column_year(col: Any) -> int | None:
+    """Fiscal year of a statement column (Timestamp or 'YYYY...' label)."""
+    try:
+        return int(pd.Timestamp(col).year)
+    except Exception:
+        try:
+            return int(str(col)[:4])
+        except Exception:
+            return None
+
+
+def _extract_metric_by_year(
+    financials: pd.DataFrame,
+    keys: Iterable[str],
+    label_map: Dict[str, Any] | None = None,
+    column_years: list[int | None] | None = None,
+) -> Dict[int, float]:
     """Return {year: value} for a given metric row from tkr.financials."""
     if financials is None or financials.empty:
         return {}
-    row_label = _find_row_label(financials.index, labels)
+    row_label = _find_row_label(financials.index, keys, label_map)
     if row_label is None:
         return {}
     series = financials.loc[row_label]
+    if column_years is None:
+        column_years = [_column_year(col) for col in series.index]
+
+    # Non-numeric entries become NaN and are dropped together with genuine gaps.
+    values = pd.to_numeric(series, errors="coerce").tolist()
+    return {
+        year: float(value)
+        for year, value in zip(column_years, values)
+        if year is not None and not pd.isna(value)
+    }
 
-    data: Dict[int, float] = {}
-    for col, value in series.items():
-        if pd.isna(value):
-            continue
-        try:
-            year = pd.Timestamp(col).year
-        except Exception:
-            try:
-                year = int(str(col)[:4])
-            except Exception:
-                continue
-        try:
-            data[int(year)] = float(value)
-        except Exception:
-            continue
-    return data
+
+def _extract_operating_metrics(
+    financials: pd.DataFrame,
+) -> tuple[Dict[int, float], Dict[int, float], Dict[int, float]]:
+    """Return (revenue, EBITDA, EBIT) by year; EBITDA falls back to EBIT + D&A when missing."""
+    if financials is None or financials.empty:
+        return {}, {}, {}
+    label_map = _row_label_map(financials.index)
+    if isinstance(financials.columns, pd.DatetimeIndex):
+        # NaT columns come back as NaN years
+        column_years: list[int | None] = [int(y) if y == y else None for y in financials.columns.year]
+    else:
+        column_years = [_column_year(col) for col in financials.columns]
+
+    revenue_by_year = _extract_metric_by_year(financials, REVENUE_KEYS, label_map, column_years)
+    ebit_by_year = _extract_metric_by_year(financials, EBIT_KEYS, label_map, column_years)
+    ebitda_by_year = _extract_metric_by_year(financials, EBITDA_KEYS, label_map, column_years)
+
+    # If EBITDA missing, try EBIT + D&A
+    if not ebitda_by_year:
+        da_by_year = _extract_metric_by_year(financials, DA_KEYS, label_map, column_years)
+        for year in set(ebit_by_year) & set(da_by_year):
+            ebitda_by_year[year] = ebit_by_year[year] + da_by_year[year]
+
+    return revenue_by_year, ebitda_by_year, ebit_by_year
 
 
 def _latest_balance_sheet_column(balance_sheet: pd.DataFrame) -> Any | None:
@@ -127,16 +245,15 @@ def _latest_balance_sheet_column(balance_sheet: pd.DataFrame) -> Any | None:
         return columns[0]
 
 
-def _extract_balance_value(balance_sheet: pd.DataFrame, labels: Iterable[str]) -> float | None:
-    if balance_sheet is None or balance_sheet.empty:
-        return None
-    row_label = _find_row_label(balance_sheet.index, labels)
+def _extract_balance_value(
+    latest: pd.Series,
+    keys: Iterable[str],
+    label_map: Dict[str, Any] | None = None,
+) -> float | None:
+    row_label = _find_row_label(latest.index, keys, label_map)
     if row_label is None:
         return None
-    latest_col = _latest_balance_sheet_column(balance_sheet)
-    if latest_col is None:
-        return None
-    value = balance_sheet.loc[row_label].get(latest_col)
+    value = latest.get(row_label)
     if value is None or pd.isna(value):
         return None
     try:
@@ -153,19 +270,26 @@ def _compute_net_debt(info: Dict[str, Any], balance_sheet: pd.DataFrame) -> floa
         except Exception:
             pass
 
-    total_debt = _extract_balance_value(balance_sheet, TOTAL_DEBT_LABELS)
+    latest_col = _latest_balance_sheet_column(balance_sheet)
+    if latest_col is None:
+        return None
+    # Only the most recent balance sheet is used; slice that column once.
+    latest = balance_sheet[latest_col]
+    label_map = _row_label_map(latest.index)
+
+    total_debt = _extract_balance_value(latest, TOTAL_DEBT_KEYS, label_map)
     if total_debt is None:
         total_debt = 0.0
         found = False
-        for label in DEBT_COMPONENT_LABELS:
-            component = _extract_balance_value(balance_sheet, [label])
+        for key in DEBT_COMPONENT_KEYS:
+            component = _extract_balance_value(latest, (key,), label_map)
             if component is not None:
                 total_debt += component
                 found = True
         if not found:
             total_debt = None
 
-    cash_value = _extract_balance_value(balance_sheet, CASH_LABELS)
+    cash_value = _extract_balance_value(latest, CASH_KEYS, label_map)
     if total_debt is None or cash_value is None:
         return None
     return total_debt - cash_value
@@ -196,10 +320,13 @@ def _build_header_maps(ws) -> tuple[Dict[str, int], Dict[tuple[str, str], int]]:
 
     last_header_1: str | None = None
 
-    for col in range(1, ws.max_column + 1):
-        header_1 = ws.cell(row=HEADER_ROW_1, column=col).value
-        header_2 = ws.cell(row=HEADER_ROW_2, column=col).value
+    # Read both header rows as plain values in one pass each instead of per-cell lookups.
+    row_1, row_2 = (
+        next(ws.iter_rows(min_row=header_row, max_row=header_row, max_col=ws.max_column, values_only=True))
+        for header_row in (HEADER_ROW_1, HEADER_ROW_2)
+    )
 
+    for col, (header_1, header_2) in enumerate(zip(row_1, row_2), start=1):
         if header_1 is not None and str(header_1).strip() != "":
             last_header_1 = str(header_1).strip()
 
@@ -214,41 +341,186 @@ def _build_header_maps(ws) -> tuple[Dict[str, int], Dict[tuple[str, str], int]]:
     return base_cols, group_cols
 
 
-def _write_operating_value(ws, row: int, col: int, value: float | None) -> None:
+def _collect_peer_rows(ws, ticker_col: int) -> list[tuple[int, str, str]]:
+    """
+    Return (row, sheet ticker, Yahoo symbol) for each peer row.
+
+    The peer block ends at the first blank ticker; the summary, TKH inputs and valuation
+    blocks further down also use column B and must not be treated as tickers.
+    """
+    peer_rows: list[tuple[int, str, str]] = []
+    ticker_values = ws.iter_rows(min_row=DATA_START_ROW, min_col=ticker_col, max_col=ticker_col, values_only=True)
+    for row, (ticker_val,) in enumerate(ticker_values, start=DATA_START_ROW):
+        if not ticker_val:
+            break
+        raw = str(ticker_val).strip()
+        peer_rows.append((row, raw, _map_ticker(raw)))
+    return peer_rows
+
+
+def _row_is_filled(ws, row: int, cols: Iterable[int]) -> bool:
+    return all(ws.cell(row=row, column=col).value is not None for col in cols)
+
+
+def _today() -> date:
+    """UTC calendar day; the Yahoo cache keys and the incremental check share this clock."""
+    return datetime.now(timezone.utc).date()
+
+
+def _filled_today(path: str) -> bool:
+    """True when path exists and was last written today (UTC, see _today)."""
+    try:
+        modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).date()
+    except OSError:
+        return False
+    return modified == _today()
+
+
+def _is_selected(value: Any) -> bool:
+    """Selected (1/0) flag as saved by Excel or openpyxl: 1, 1.0, True and "1" all count."""
+    if isinstance(value, bool):
+        return value
+    try:
+        return float(str(value).strip()) == 1
+    except (TypeError, ValueError):
+        return False
+
+
+def _write_operating_value(
+    ws,
+    row: int,
+    col: int,
+    value: float | None,
+    template_fill: PatternFill | None = None,
+) -> None:
     cell = ws.cell(row=row, column=col)
     if value is None:
         cell.value = None
         cell.fill = MISSING_OPERATING_FILL
     else:
         cell.value = _to_ccy_m(value)
+        if template_fill is not None:
+            cell.fill = template_fill
 
 
-def _fetch_ticker_data(ysym: str) -> tuple[yf.Ticker | None, dict, pd.DataFrame, pd.DataFrame]:
+def _fetch_ticker_data(ysym: str) -> tuple[yf.Ticker | None, dict, pd.DataFrame, pd.DataFrame, list[str]]:
+    """Fetch info, financials and balance sheet; the last item names the calls that failed."""
+    failed: list[str] = []
     try:
         tkr = yf.Ticker(ysym)
     except Exception as exc:
         print(f"{ysym}: ticker init failed: {exc}")
-        return None, {}, pd.DataFrame(), pd.DataFrame()
+        return None, {}, pd.DataFrame(), pd.DataFrame(), ["ticker"]
 
     try:
-        info = tkr.get_info() or {}
+        info = _with_rate_limit_retry(tkr.get_info, f"{ysym} get_info") or {}
     except Exception as exc:
         print(f"{ysym}: get_info failed: {exc}")
         info = {}
+    if not info:
+        failed.append("get_info")
 
     try:
-        financials = tkr.financials
+        financials = _with_rate_limit_retry(lambda: tkr.financials, f"{ysym} financials")
     except Exception as exc:
         print(f"{ysym}: financials failed: {exc}")
         financials = pd.DataFrame()
+        failed.append("financials")
 
     try:
-        balance_sheet = tkr.balance_sheet
+        balance_sheet = _with_rate_limit_retry(lambda: tkr.balance_sheet, f"{ysym} balance sheet")
     except Exception as exc:
         print(f"{ysym}: balance sheet failed: {exc}")
         balance_sheet = pd.DataFrame()
+        failed.append("balance_sheet")
+
+    return tkr, info, financials, balance_sheet, failed
 
-    return tkr, info, financials, balance_sheet
+
+def _fetch_all_ticker_data(
+    symbols: Iterable[str],
+    refresh: bool = False,
+) -> Dict[str, tuple[yf.Ticker | None, Dict[str, Any], pd.DataFrame, pd.DataFrame]]:
+    """
+    Fetch info/financials/balance sheet for every symbol concurrently (calls are network-bound).
+
+    Complete fetches are kept in a small on-disk cache keyed by symbol and UTC date, so
+    repeated runs on the same day only build the (offline) Ticker objects. With refresh=True
+    the cache is not read, but fresh results still replace today's entries.
+    """
+    symbols = list(symbols)
+    today = _today().isoformat()
+    results: Dict[str, tuple[yf.Ticker | None, Dict[str, Any], pd.DataFrame, pd.DataFrame]] = {}
+
+    with shelve.open(YAHOO_CACHE_FILE) as cache:
+        # Entries from earlier days are never read again; drop them so the file stays small.
+        for key in [key for key in cache if not key.endswith(f":{today}")]:
+            del cache[key]
+
+        to_fetch = []
+        for ysym in symbols:
+            cached = None if refresh else cache.get(f"{ysym}:{today}")
+            if cached is None:
+                to_fetch.append(ysym)
+            else:
+                info, financials, balance_sheet = cached
+                results[ysym] = (yf.Ticker(ysym), info, financials, balance_sheet)
+
+        fetched = []
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(to_fetch))) as pool:
+                fetched = list(zip(to_fetch, pool.map(_fetch_ticker_data, to_fetch)))
+
+        # Only complete fetches are cached; a partial failure would otherwise stick for the whole day.
+        for ysym, (tkr, info, financials, balance_sheet, failed) in fetched:
+            if failed:
+                print(f"{ysym}: incomplete Yahoo data ({', '.join(failed)}); not cached")
+            else:
+                cache[f"{ysym}:{today}"] = (info, financials, balance_sheet)
+            results[ysym] = (tkr, info, financials, balance_sheet)
+
+    return {ysym: results[ysym] for ysym in symbols}
+
+
+def _download_last_closes(symbols: list[str]) -> Dict[str, float]:
+    """Last close per symbol from batched downloads; symbols without a price are omitted."""
+    closes: Dict[str, float] = {}
+    for start in range(0, len(symbols), DOWNLOAD_BATCH_SIZE):
+        closes.update(_download_batch_closes(symbols[start : start + DOWNLOAD_BATCH_SIZE]))
+    return closes
+
+
+def _download_batch_closes(symbols: list[str]) -> Dict[str, float]:
+    try:
+        prices = yf.download(
+            symbols,
+            period="5d",
+            group_by="ticker",
+            threads=True,
+            progress=False,
+            auto_adjust=True,
+        )
+    except Exception as exc:
+        print(f"Batch price download failed for {', '.join(symbols)}: {exc}")
+        return {}
+    if prices is None or prices.empty:
+        return {}
+
+    closes: Dict[str, float] = {}
+    for ysym in symbols:
+        try:
+            if isinstance(prices.columns, pd.MultiIndex):
+                close = prices[ysym]["Close"]
+            elif len(symbols) == 1:
+                close = prices["Close"]
+            else:
+                continue
+        except KeyError:
+            continue
+        close = close.dropna()
+        if not close.empty:
+            closes[ysym] = float(close.iloc[-1])
+    return closes
 
 
 def _fetch_fx_rate(ccy: str | None, fx_cache: Dict[str, float]) -> float | None:
@@ -276,6 +548,42 @@ def _fetch_fx_rate(ccy: str | None, fx_cache: Dict[str, float]) -> float | None:
     return None
 
 
+def _parse_fx_overrides(raw: str | None) -> Dict[str, float]:
+    """Parse "CCY=rate" pairs (comma separated) into a currency -> EUR rate map."""
+    overrides: Dict[str, float] = {}
+    for item in (raw or "").split(","):
+        if not item.strip():
+            continue
+        ccy, _, rate = item.partition("=")
+        try:
+            overrides[ccy.strip().upper()] = float(rate)
+        except ValueError:
+            print(f"Ignoring invalid {YAHOO_FX_ENV} entry: {item.strip()!r}")
+    return overrides
+
+
+def _fetch_fx_rates(currencies: Iterable[str | None], overrides: Dict[str, float] | None = None) -> Dict[str, float]:
+    """EUR rates for all distinct non-EUR currencies: overrides first, then one batched download."""
+    pending = sorted({ccy for ccy in currencies if ccy and ccy != "EUR"})
+    overrides = overrides or {}
+    rates = {ccy: overrides[ccy] for ccy in pending if ccy in overrides}
+
+    remaining = [ccy for ccy in pending if ccy not in rates]
+    if remaining:
+        # Direct (xxxEUR=X) and inverse (EURxxx=X) pairs in one batch; the direct quote wins.
+        closes = _download_last_closes(
+            [f"{ccy}EUR=X" for ccy in remaining] + [f"EUR{ccy}=X" for ccy in remaining]
+        )
+        for ccy in remaining:
+            direct = closes.get(f"{ccy}EUR=X")
+            inverse = closes.get(f"EUR{ccy}=X")
+            if direct is not None:
+                rates[ccy] = direct
+            elif inverse:
+                rates[ccy] = 1.0 / inverse
+    return rates
+
+
 def _find_tkh_inputs_block(ws) -> int | None:
     for row in range(1, ws.max_row + 1):
         cell_value = ws.cell(row=row, column=1).value
@@ -301,8 +609,8 @@ def _parse_year_columns(ws, header_row: int) -> Dict[int, int]:
 def _fill_tkh_inputs(
     ws,
     info: Dict[str, Any],
-    financials: pd.DataFrame,
-    balance_sheet: pd.DataFrame,
+    operating_metrics: tuple[Dict[int, float], Dict[int, float], Dict[int, float]],
+    net_debt_value: float | None,
 ) -> None:
     block_row = _find_tkh_inputs_block(ws)
     if block_row is None:
@@ -326,14 +634,7 @@ def _fill_tkh_inputs(
             break
         metric_rows[str(label).strip()] = row
 
-    revenue_by_year = _extract_metric_by_year(financials, REVENUE_LABELS)
-    ebitda_by_year = _extract_metric_by_year(financials, EBITDA_LABELS)
-    ebit_by_year = _extract_metric_by_year(financials, EBIT_LABELS)
-
-    if not ebitda_by_year:
-        da_by_year = _extract_metric_by_year(financials, DA_LABELS)
-        for year in set(ebit_by_year) & set(da_by_year):
-            ebitda_by_year[year] = ebit_by_year[year] + da_by_year[year]
+    revenue_by_year, ebitda_by_year, ebit_by_year = operating_metrics
 
     metric_sources = {
         "Revenue (CCY m)": revenue_by_year,
@@ -351,7 +652,6 @@ def _fill_tkh_inputs(
 
     net_debt_row = metric_rows.get("Net Debt (CCY m)")
     if net_debt_row is not None:
-        net_debt_value = _compute_net_debt(info, balance_sheet)
         ws.cell(row=net_debt_row, column=year_cols[latest_year], value=_to_ccy_m(net_debt_value))
 
     shares_row = metric_rows.get("Shares Outstanding (m)")
@@ -368,12 +668,29 @@ def _fill_tkh_inputs(
             ws.cell(row=adjustments_row, column=col, value=0)
 
 
+def _save_atomically(wb, path: str) -> None:
+    """Save next to the target and swap it in, so an interrupted run never leaves a truncated file."""
+    tmp_path = f"{path}.tmp"
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def main() -> None:
-    wb = load_workbook(INPUT_FILE)
+    # Incremental runs continue from today's output so completed rows can be skipped.
+    incremental = os.getenv(YAHOO_INCREMENTAL_ENV, "").strip() not in ("", "0")
+    source_file = OUTPUT_FILE if incremental and _filled_today(OUTPUT_FILE) else INPUT_FILE
+
+    # The peer workbook has no external links to preserve.
+    wb = load_workbook(source_file, keep_links=False)
     ws = wb[SHEET_NAME]
 
     base_cols, group_cols = _build_header_maps(ws)
 
+    # Ticker first, then the columns written per peer row in this order.
     required_base = [
         "Ticker",
         "Currency",
@@ -401,40 +718,68 @@ def main() -> None:
             if (group, str(y)) not in group_cols:
                 raise ValueError(f"Missing grouped column: {group} / {y}")
 
-    ticker_cache: Dict[str, tuple[yf.Ticker | None, Dict[str, Any], pd.DataFrame, pd.DataFrame]] = {}
-    fx_cache: Dict[str, float] = {}
-
-    for row in range(DATA_START_ROW, ws.max_row + 1):
-        ticker_val = ws.cell(row=row, column=base_cols["Ticker"]).value
-        if not ticker_val:
-            continue
+    # Column positions are fixed for the whole run; resolve them once.
+    base_write_cols = [base_cols[label] for label in required_base[1:]]
+    operating_cols = [
+        (
+            year,
+            group_cols[("Revenue (CCY m)", str(year))],
+            group_cols[("EBITDA (CCY m)", str(year))],
+            group_cols[("EBIT (CCY m)", str(year))],
+        )
+        for year in years
+    ]
 
-        raw = str(ticker_val).strip()
-        ysym = _map_ticker(raw)
-        if ysym not in ticker_cache:
-            ticker_cache[ysym] = _fetch_ticker_data(ysym)
+    peer_rows = _collect_peer_rows(ws, base_cols["Ticker"])
+    if source_file == OUTPUT_FILE:
+        # Operating gaps are marked as missing data, so a complete base block means the row was fetched.
+        pending = [entry for entry in peer_rows if not _row_is_filled(ws, entry[0], base_write_cols)]
+        if len(pending) < len(peer_rows):
+            print(f"Incremental run: {len(peer_rows) - len(pending)} complete peer rows kept from {OUTPUT_FILE}")
+        peer_rows = pending
+    symbols = list(dict.fromkeys([ysym for _, _, ysym in peer_rows] + ["TWEKA.AS"]))
+    refresh = os.getenv(YAHOO_REFRESH_ENV, "").strip() not in ("", "0")
+    ticker_cache = _fetch_all_ticker_data(symbols, refresh=refresh)
+    last_closes = _download_last_closes(symbols)
+    fx_cache = _fetch_fx_rates(
+        (info.get("currency") for _, info, _, _ in ticker_cache.values()),
+        _parse_fx_overrides(os.getenv(YAHOO_FX_ENV)),
+    )
+
+    # Statement-derived figures per symbol, shared by the peer rows and the TKH inputs block.
+    operating_metrics = {
+        ysym: _extract_operating_metrics(financials) for ysym, (_, _, financials, _) in ticker_cache.items()
+    }
+    net_debts = {
+        ysym: _compute_net_debt(info, balance_sheet) for ysym, (_, info, _, balance_sheet) in ticker_cache.items()
+    }
 
-        tkr, info, financials, balance_sheet = ticker_cache[ysym]
+    selected_col = base_cols.get("Selected (1/0)")
+    for row, raw, ysym in peer_rows:
+        tkr, info, _, _ = ticker_cache[ysym]
         if tkr is None:
             continue
 
-        share_price = _last_close_price(tkr)
+        # An earlier run may have marked this row's gaps as missing; values written now get the row fill back.
+        template_fill = None
+        if source_file == OUTPUT_FILE:
+            selected = selected_col is not None and _is_selected(ws.cell(row=row, column=selected_col).value)
+            template_fill = SELECTED_FILL if selected else NO_FILL
+
+        # Batched close first, then the quote already in info; history() costs another request.
+        share_price = last_closes.get(ysym)
+        if share_price is None:
+            share_price = _info_price(info)
+        if share_price is None:
+            share_price = _last_close_price(tkr)
         currency = info.get("currency")
         market_cap = info.get("marketCap")
         enterprise_value = info.get("enterpriseValue")
-        net_debt = _compute_net_debt(info, balance_sheet)
+        net_debt = net_debts[ysym]
         equity_beta = info.get("beta")
         fx_rate = _fetch_fx_rate(currency, fx_cache)
 
-        revenue_by_year = _extract_metric_by_year(financials, REVENUE_LABELS)
-        ebit_by_year = _extract_metric_by_year(financials, EBIT_LABELS)
-        ebitda_by_year = _extract_metric_by_year(financials, EBITDA_LABELS)
-
-        # If EBITDA missing, try EBIT + D&A
-        if not ebitda_by_year:
-            da_by_year = _extract_metric_by_year(financials, DA_LABELS)
-            for year in set(ebit_by_year) & set(da_by_year):
-                ebitda_by_year[year] = ebit_by_year[year] + da_by_year[year]
+        revenue_by_year, ebitda_by_year, ebit_by_year = operating_metrics[ysym]
 
         if currency is None:
             print(f"{raw} -> {ysym}: warning - missing currency")
@@ -455,53 +800,39 @@ def main() -> None:
         if not ebit_by_year:
             print(f"{raw} -> {ysym}: warning - missing EBIT in financials")
 
-        # Write base cells
-        ws.cell(row=row, column=base_cols["Currency"], value=currency)
-        ws.cell(row=row, column=base_cols["Share Price (CCY)"], value=share_price)
-        ws.cell(row=row, column=base_cols["Market Cap (CCY m)"], value=_to_ccy_m(market_cap))
-        ws.cell(row=row, column=base_cols["Enterprise Value (CCY m)"], value=_to_ccy_m(enterprise_value))
-        ws.cell(row=row, column=base_cols["Net Debt (CCY m)"], value=_to_ccy_m(net_debt))
-        ws.cell(row=row, column=base_cols["Equity Beta"], value=equity_beta)
-        ws.cell(row=row, column=base_cols["FX to EUR"], value=fx_rate)
-        ws.cell(
-            row=row,
-            column=base_cols["Share Price (EUR)"],
-            value=share_price * fx_rate if share_price is not None and fx_rate is not None else None,
-        )
-        ws.cell(
-            row=row,
-            column=base_cols["Market Cap (EUR m)"],
-            value=_to_ccy_m(market_cap) * fx_rate
-            if market_cap is not None and fx_rate is not None
-            else None,
-        )
-        ws.cell(
-            row=row,
-            column=base_cols["Enterprise Value (EUR m)"],
-            value=_to_ccy_m(enterprise_value) * fx_rate
-            if enterprise_value is not None and fx_rate is not None
-            else None,
-        )
-        ws.cell(
-            row=row,
-            column=base_cols["Net Debt (EUR m)"],
-            value=_to_ccy_m(net_debt) * fx_rate if net_debt is not None and fx_rate is not None else None,
+        # Convert to CCY m once; the EUR columns reuse the converted values.
+        market_cap_m = _to_ccy_m(market_cap)
+        enterprise_value_m = _to_ccy_m(enterprise_value)
+        net_debt_m = _to_ccy_m(net_debt)
+
+        # Write base cells (values line up with base_write_cols)
+        base_values = (
+            currency,
+            share_price,
+            market_cap_m,
+            enterprise_value_m,
+            net_debt_m,
+            equity_beta,
+            fx_rate,
+            _to_eur(share_price, fx_rate),
+            _to_eur(market_cap_m, fx_rate),
+            _to_eur(enterprise_value_m, fx_rate),
+            _to_eur(net_debt_m, fx_rate),
         )
+        for col, value in zip(base_write_cols, base_values):
+            ws.cell(row=row, column=col, value=value)
 
         # Write year-group operating metrics
-        for year in years:
-            _write_operating_value(ws, row, group_cols[("Revenue (CCY m)", str(year))], revenue_by_year.get(year))
-            _write_operating_value(ws, row, group_cols[("EBITDA (CCY m)", str(year))], ebitda_by_year.get(year))
-            _write_operating_value(ws, row, group_cols[("EBIT (CCY m)", str(year))], ebit_by_year.get(year))
+        for year, revenue_col, ebitda_col, ebit_col in operating_cols:
+            _write_operating_value(ws, row, revenue_col, revenue_by_year.get(year), template_fill)
+            _write_operating_value(ws, row, ebitda_col, ebitda_by_year.get(year), template_fill)
+            _write_operating_value(ws, row, ebit_col, ebit_by_year.get(year), template_fill)
 
         print(f"Filled {raw} (Yahoo: {ysym})")
 
-    if "TWEKA.AS" not in ticker_cache:
-        ticker_cache["TWEKA.AS"] = _fetch_ticker_data("TWEKA.AS")
-    _, tkh_info, tkh_financials, tkh_balance = ticker_cache["TWEKA.AS"]
-    _fill_tkh_inputs(ws, tkh_info, tkh_financials, tkh_balance)
+    _fill_tkh_inputs(ws, ticker_cache["TWEKA.AS"][1], operating_metrics["TWEKA.AS"], net_debts["TWEKA.AS"])
 
-    wb.save(OUTPUT_FILE)
+    _save_atomically(wb, OUTPUT_FILE)
     print(f"Saved {OUTPUT_FILE}")
 
 
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import re
+import zipfile
 from copy import copy
 from pathlib import Path
+from statistics import mean, median
 
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.formatting.rule import CellIsRule
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import ColumnDimension, RowDimension
 
 SRC = Path('outputs/TKH_Peer_Analysis_submission_ready.xlsx')
 DST = Path('outputs/TKH_Peer_Analysis_submission_ready_FINAL.xlsx')
@@ -20,6 +24,20 @@ THIN = Side(style='thin', color='D9D9D9')
 BORDER = Border(left=THIN, right=THIN, top=THIN, bottom=THIN)
 NEG_FILL = PatternFill('solid', fgColor='FCE4D6')
 
+# WACC_Model assumptions, shared by the written formulas and the cached results in evaluate_wacc
+TAX_RATE = 0.25
+TARGET_DE = 0.25
+LEFT_ALIGN = Alignment(horizontal='left')
+RIGHT_ALIGN = Alignment(horizontal='right')
+HEADER_ALIGN = Alignment(horizontal='center', wrap_text=True)
+WRAP_TOP_ALIGN = Alignment(vertical='top', wrap_text=True)
+
+# CCA_Model per-row formulas: EUR value = hidden helper CCY value x FX; multiple = EV (EUR) / metric (EUR)
+EUR_FORMULA = '=IFERROR({helper}{row}*F{row},"")'
+MULTIPLE_FORMULA = '=IFERROR(I{row}/{metric}{row},"")'
+EUR_HELPER_COLUMNS = ('W', 'X', 'Y', 'Z', 'AA', 'AB', 'AC', 'AD', 'AE')  # feed H:P
+MULTIPLE_METRIC_COLUMNS = ('K', 'L', 'M', 'N', 'O', 'P')  # feed Q:V
+
 
 def copy_sheet(ws_src, wb_dst: Workbook, title: str):
     ws = wb_dst.create_sheet(title)
@@ -29,25 +47,32 @@ def copy_sheet(ws_src, wb_dst: Workbook, title: str):
     ws.freeze_panes = ws_src.freeze_panes
 
     for col, dim in ws_src.column_dimensions.items():
-        ws.column_dimensions[col].width = dim.width
-        ws.column_dimensions[col].hidden = dim.hidden
-        ws.column_dimensions[col].outlineLevel = dim.outlineLevel
+        ws.column_dimensions[col] = ColumnDimension(
+            ws, index=col, width=dim.width, hidden=dim.hidden, outlineLevel=dim.outlineLevel
+        )
 
     for ridx, dim in ws_src.row_dimensions.items():
-        ws.row_dimensions[ridx].height = dim.height
-        ws.row_dimensions[ridx].hidden = dim.hidden
-        ws.row_dimensions[ridx].outlineLevel = dim.outlineLevel
+        ws.row_dimensions[ridx] = RowDimension(
+            ws, index=ridx, height=dim.height, hidden=dim.hidden, outlineLevel=dim.outlineLevel
+        )
 
+    # Sheets use a handful of distinct styles; copy each combination once and reuse it.
+    style_cache = {}
     for row in ws_src.iter_rows(min_row=1, max_row=ws_src.max_row, min_col=1, max_col=ws_src.max_column):
         for cell in row:
             tgt = ws.cell(cell.row, cell.column, cell.value)
             if cell.has_style:
-                tgt.font = copy(cell.font)
-                tgt.fill = copy(cell.fill)
-                tgt.border = copy(cell.border)
-                tgt.alignment = copy(cell.alignment)
-                tgt.number_format = copy(cell.number_format)
-                tgt.protection = copy(cell.protection)
+                styles = style_cache.get(cell.style_id)
+                if styles is None:
+                    styles = style_cache[cell.style_id] = (
+                        copy(cell.font),
+                        copy(cell.fill),
+                        copy(cell.border),
+                        copy(cell.alignment),
+                        cell.number_format,
+                        copy(cell.protection),
+                    )
+                tgt.font, tgt.fill, tgt.border, tgt.alignment, tgt.number_format, tgt.protection = styles
             if cell.comment:
                 tgt.comment = copy(cell.comment)
             if cell.hyperlink:
@@ -61,38 +86,113 @@ def copy_sheet(ws_src, wb_dst: Workbook, title: str):
 def build_wacc(ws):
     # Fill missing Huber+Suhner peer stats
     ws['D7'] = -165.2416
+    # D/E (F) and unlevered beta (G) per peer row
     for r in range(2, 11):
-        ws[f'F{r}'] = f'=IFERROR(D{r}/E{r},"")'
-    ws['F2'] = '=IFERROR(D2/E2,"")'
-    ws['F3'] = '=IFERROR(D3/E3,"")'
-    ws['F4'] = '=IFERROR(D4/E4,"")'
-    ws['F5'] = '=IFERROR(D5/E5,"")'
-    ws['F6'] = '=IFERROR(D6/E6,"")'
-    ws['F7'] = '=IFERROR(D7/E7,"")'
-    ws['F8'] = '=IFERROR(D8/E8,"")'
-    ws['F9'] = '=IFERROR(D9/E9,"")'
-    ws['F10'] = '=IFERROR(D10/E10,"")'
-
-    for r in range(2, 11):
-        ws[f'G{r}'] = f'=IFERROR(C{r}/(1+(1-0.25)*F{r}),"")'
+        ws.cell(r, 6, f'=IFERROR(D{r}/E{r},"")')
+        ws.cell(r, 7, f'=IFERROR(C{r}/(1+(1-{TAX_RATE})*F{r}),"")')
 
     ws['B14'] = '=AVERAGEIF(B2:B10,1,C2:C10)'
     ws['B15'] = '=MEDIAN(IF(B2:B10=1,C2:C10))'
     ws['B16'] = '=AVERAGEIF(B2:B10,1,G2:G10)'
     ws['B17'] = '=MEDIAN(IF(B2:B10=1,G2:G10))'
-    ws['B18'] = '=B17*(1+(1-0.25)*0.25)'
+    ws['B18'] = f'=B17*(1+(1-{TAX_RATE})*{TARGET_DE})'
     ws['B20'] = 0.055
     ws['B22'] = '=B19+B18*B20+B21'
-    ws['B25'] = '=B22*(1/(1+0.25))+B23*(1-0.25)*(0.25/(1+0.25))'
+    ws['B25'] = f'=B22*(1/(1+{TARGET_DE}))+B23*(1-{TAX_RATE})*({TARGET_DE}/(1+{TARGET_DE}))'
+
+
+def evaluate_wacc(ws) -> dict[str, float]:
+    """
+    Python results for the numeric WACC_Model formulas written by build_wacc.
+
+    Follows Excel's rules: blank cells count as zero in arithmetic, AVERAGEIF skips blanks and text,
+    MEDIAN(IF(...)) reads a blank selected beta as zero, and a formula that would error gets no cached value.
+    Nothing is cached when an input cell holds a formula of its own, since openpyxl only sees its text.
+    """
+    inputs = [f'{col}{r}' for r in range(2, 11) for col in 'BCDE'] + ['B19', 'B20', 'B21', 'B23']
+    formula_inputs = [coord for coord in inputs if isinstance(ws[coord].value, str) and ws[coord].value.startswith('=')]
+    if formula_inputs:
+        print(f"WACC_Model inputs {', '.join(formula_inputs)} are formulas; cached values skipped")
+        return {}
+
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    def operand(coord):
+        value = ws[coord].value
+        if value is None:
+            return 0.0
+        return value if is_number(value) else None
+
+    values: dict[str, float] = {}
+    for r in range(2, 11):
+        net_debt, mcap, beta = operand(f'D{r}'), operand(f'E{r}'), operand(f'C{r}')
+        if net_debt is None or not mcap:
+            continue  # IFERROR(D/E,"") -> ""
+        values[f'F{r}'] = net_debt / mcap
+        denominator = 1 + (1 - TAX_RATE) * values[f'F{r}']
+        if beta is not None and denominator:
+            values[f'G{r}'] = beta / denominator
+
+    selected = [r for r in range(2, 11) if is_number(ws[f'B{r}'].value) and ws[f'B{r}'].value == 1]
+    levered_mean = [ws[f'C{r}'].value for r in selected if is_number(ws[f'C{r}'].value)]
+    levered_median = [ws[f'C{r}'].value or 0.0 for r in selected if ws[f'C{r}'].value is None or is_number(ws[f'C{r}'].value)]
+    unlevered = [values[f'G{r}'] for r in selected if f'G{r}' in values]
+    if levered_mean:
+        values['B14'] = mean(levered_mean)
+    if levered_median:
+        values['B15'] = median(levered_median)
+    if not unlevered:
+        return values
+    values['B16'] = mean(unlevered)
+    values['B17'] = median(unlevered)
+    values['B18'] = values['B17'] * (1 + (1 - TAX_RATE) * TARGET_DE)
+
+    rf, erp, sfp, cost_debt = operand('B19'), operand('B20'), operand('B21'), operand('B23')
+    if None in (rf, erp, sfp, cost_debt):
+        return values
+    values['B22'] = rf + values['B18'] * erp + sfp
+    values['B25'] = (
+        values['B22'] * (1 / (1 + TARGET_DE))
+        + cost_debt * (1 - TAX_RATE) * (TARGET_DE / (1 + TARGET_DE))
+    )
+    return values
+
+
+def write_cached_values(path: Path, sheet_number: int, values: dict[str, float]) -> None:
+    """Store results next to the formulas of one saved sheet so data_only readers see numbers before a recalc."""
+    member = f'xl/worksheets/sheet{sheet_number}.xml'
+    # openpyxl writes formula cells as <c r="B25" ...><f>...</f><v></v></c> with lxml and <v/> without it
+    formula_cell = re.compile(r'(<c r="([A-Z]+[0-9]+)"[^>]*><f>[^<]*</f>)(?:<v></v>|<v\s*/>)')
+    written = set()
+
+    def fill(match):
+        value = values.get(match.group(2))
+        if value is None:
+            return match.group(0)
+        written.add(match.group(2))
+        return f'{match.group(1)}<v>{value!r}</v>'
+
+    with zipfile.ZipFile(path) as zin:
+        members = [(info, zin.read(info.filename)) for info in zin.infolist()]
+    members = [
+        (info, formula_cell.sub(fill, data.decode('utf-8')).encode('utf-8') if info.filename == member else data)
+        for info, data in members
+    ]
+    missing = sorted(set(values) - written)
+    if missing:
+        raise ValueError(f"{member}: no formula cell to cache {', '.join(missing)}")
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for info, data in members:
+            zout.writestr(info, data)
 
 
 def apply_table_style(ws, min_row, max_row, min_col, max_col):
-    for r in range(min_row, max_row + 1):
-        for c in range(min_col, max_col + 1):
-            cell = ws.cell(r, c)
+    for row in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+        for cell in row:
             cell.border = BORDER
-            if c >= min_col + 4 and isinstance(cell.value, (int, float)):
-                cell.alignment = Alignment(horizontal='right')
+            if cell.column >= min_col + 4 and isinstance(cell.value, (int, float)):
+                cell.alignment = RIGHT_ALIGN
 
 
 def build_cca(wb_src, wb_dst):
@@ -106,7 +206,6 @@ def build_cca(wb_src, wb_dst):
         'Revenue 2023 (EUR m)', 'EBITDA 2023 (EUR m)', 'EBIT 2023 (EUR m)',
         'Revenue 2024 (EUR m)', 'EBITDA 2024 (EUR m)', 'EBIT 2024 (EUR m)',
         'EV/Sales 2023', 'EV/EBITDA 2023', 'EV/EBIT 2023',
-        'EV/Sales 2024', 'EV/EBITDA 2024', 'EV/EBIT 2024',
         'EV/Sales 2024', 'EV/EBITDA 2024', 'EV/EBIT 2024'
     ]
 
@@ -114,13 +213,13 @@ def build_cca(wb_src, wb_dst):
     ws['A1'] = 'COMPARABLE COMPANY ANALYSIS (Trading Comps)'
     ws['A1'].fill = HEADER_FILL
     ws['A1'].font = Font(color='FFFFFF', bold=True, size=12)
-    ws['A1'].alignment = Alignment(horizontal='left')
+    ws['A1'].alignment = LEFT_ALIGN
 
     for i, h in enumerate(headers, 1):
         cell = ws.cell(3, i, h)
         cell.fill = HEADER_FILL
         cell.font = WHITE_FONT
-        cell.alignment = Alignment(horizontal='center', wrap_text=True)
+        cell.alignment = HEADER_ALIGN
 
     # Hidden helper area for transparent FX conversion without circular refs
     helper_headers = {
@@ -142,89 +241,39 @@ def build_cca(wb_src, wb_dst):
 
     out_row = 4
     peer_rows: list[int] = []
-    for r in range(2, 11):
-        company = src.cell(r, 1).value
+    # Peer_Table columns A:Y as plain values (Revenue/EBITDA/EBIT 2023 in Q:S, 2024 in W:Y)
+    for (
+        company, ticker, selected, _, _, _, _, currency, share_price, mcap, ev, gross_debt, cash, net_debt, _,
+        fx, revenue_23, ebitda_23, ebit_23, _, _, _, revenue_24, ebitda_24, ebit_24,
+    ) in src.iter_rows(min_row=2, max_row=10, max_col=25, values_only=True):
         role = 'Subject' if 'subject' in str(company).lower() else 'Peer'
 
-        ws[f'A{out_row}'] = company
-        ws[f'B{out_row}'] = src.cell(r, 2).value
-        ws[f'C{out_row}'] = role
-        ws[f'D{out_row}'] = src.cell(r, 3).value  # keep original selected flag (NKT/Mersen remain 0)
-        ws[f'E{out_row}'] = src.cell(r, 8).value
-        ws[f'F{out_row}'] = src.cell(r, 16).value
-        ws[f'G{out_row}'] = src.cell(r, 9).value
-
-        # helper raw ccy values from Peer_Table
-        ws[f'W{out_row}'] = src.cell(r, 10).value
-        ws[f'X{out_row}'] = src.cell(r, 11).value
-        ws[f'Y{out_row}'] = src.cell(r, 14).value
-        ws[f'Z{out_row}'] = src.cell(r, 17).value
-        ws[f'AA{out_row}'] = src.cell(r, 18).value
-        ws[f'AB{out_row}'] = src.cell(r, 19).value
-        ws[f'AC{out_row}'] = src.cell(r, 23).value
-        ws[f'AD{out_row}'] = src.cell(r, 24).value
-        ws[f'AE{out_row}'] = src.cell(r, 25).value
-        ws[f'AF{out_row}'] = src.cell(r, 12).value
-        ws[f'AG{out_row}'] = src.cell(r, 13).value
-
-        # visible EUR numbers formula-driven off helper + FX
-        ws[f'H{out_row}'] = f'=IFERROR(W{out_row}*F{out_row},"")'
-        ws[f'I{out_row}'] = f'=IFERROR(X{out_row}*F{out_row},"")'
-        ws[f'J{out_row}'] = f'=IFERROR(Y{out_row}*F{out_row},"")'
-        ws[f'K{out_row}'] = f'=IFERROR(Z{out_row}*F{out_row},"")'
-        ws[f'L{out_row}'] = f'=IFERROR(AA{out_row}*F{out_row},"")'
-        ws[f'M{out_row}'] = f'=IFERROR(AB{out_row}*F{out_row},"")'
-        ws[f'N{out_row}'] = f'=IFERROR(AC{out_row}*F{out_row},"")'
-        ws[f'O{out_row}'] = f'=IFERROR(AD{out_row}*F{out_row},"")'
-        ws[f'P{out_row}'] = f'=IFERROR(AE{out_row}*F{out_row},"")'
-
-        # multiples off visible EUR values
-        ws[f'Q{out_row}'] = f'=IFERROR(I{out_row}/K{out_row},"")'
-        ws[f'R{out_row}'] = f'=IFERROR(I{out_row}/L{out_row},"")'
-        ws[f'S{out_row}'] = f'=IFERROR(I{out_row}/M{out_row},"")'
-        ws[f'T{out_row}'] = f'=IFERROR(I{out_row}/N{out_row},"")'
-        ws[f'U{out_row}'] = f'=IFERROR(I{out_row}/O{out_row},"")'
-        ws[f'V{out_row}'] = f'=IFERROR(I{out_row}/P{out_row},"")'
-
-        c = ws.cell(3, i, h)
-        c.fill = HEADER_FILL
-        c.font = WHITE_FONT
-        c.alignment = Alignment(horizontal='center', wrap_text=True)
-
-    # rows 2-10 in source include peers + subject
-    out_row = 4
-    peer_rows = []
-    for r in range(2, 11):
-        name = src.cell(r, 1).value
-        role = 'Subject' if 'subject' in str(name).lower() else 'Peer'
-        ws.cell(out_row, 1, name)
-        ws.cell(out_row, 2, src.cell(r, 2).value)
-        ws.cell(out_row, 3, role)
-        ws.cell(out_row, 4, 1)
-        ws.cell(out_row, 5, src.cell(r, 8).value)
-        ws.cell(out_row, 6, src.cell(r, 16).value)
-        ws.cell(out_row, 7, src.cell(r, 9).value)
-
-        ws.cell(out_row, 8, f'=IFERROR(J{out_row}*F{out_row},"")')
-        ws.cell(out_row, 9, f'=IFERROR(K{out_row}*F{out_row},"")')
-        ws.cell(out_row, 10, f'=IFERROR(N{out_row}*F{out_row},"")')
-
-        ws.cell(out_row, 11, f'=IFERROR(Q{out_row}*F{out_row},"")')
-        ws.cell(out_row, 12, f'=IFERROR(R{out_row}*F{out_row},"")')
-        ws.cell(out_row, 13, f'=IFERROR(S{out_row}*F{out_row},"")')
-        ws.cell(out_row, 14, f'=IFERROR(W{out_row}*F{out_row},"")')
-        ws.cell(out_row, 15, f'=IFERROR(X{out_row}*F{out_row},"")')
-        ws.cell(out_row, 16, f'=IFERROR(Y{out_row}*F{out_row},"")')
-
-        for c_src, c_dst in [(10, 'J'), (11, 'K'), (14, 'N'), (17, 'Q'), (18, 'R'), (19, 'S'), (23, 'W'), (24, 'X'), (25, 'Y')]:
-            ws[f'{c_dst}{out_row}'] = src.cell(r, c_src).value
-
-        ws.cell(out_row, 17, f'=IFERROR(I{out_row}/K{out_row},"")')
-        ws.cell(out_row, 18, f'=IFERROR(I{out_row}/L{out_row},"")')
-        ws.cell(out_row, 19, f'=IFERROR(I{out_row}/M{out_row},"")')
-        ws.cell(out_row, 20, f'=IFERROR(I{out_row}/N{out_row},"")')
-        ws.cell(out_row, 21, f'=IFERROR(I{out_row}/O{out_row},"")')
-        ws.cell(out_row, 22, f'=IFERROR(I{out_row}/P{out_row},"")')
+        # rows are appended in order (header is row 3), so each append lands on out_row
+        ws.append([
+            company,
+            ticker,
+            role,
+            selected,  # keep original selected flag (NKT/Mersen remain 0)
+            currency,
+            fx,
+            share_price,
+            # visible EUR numbers formula-driven off helper + FX
+            *[EUR_FORMULA.format(helper=col, row=out_row) for col in EUR_HELPER_COLUMNS],
+            # multiples off visible EUR values
+            *[MULTIPLE_FORMULA.format(metric=col, row=out_row) for col in MULTIPLE_METRIC_COLUMNS],
+            # helper raw ccy values from Peer_Table (W:AG)
+            mcap,
+            ev,
+            net_debt,
+            revenue_23,
+            ebitda_23,
+            ebit_23,
+            revenue_24,
+            ebitda_24,
+            ebit_24,
+            gross_debt,
+            cash,
+        ])
         if role == 'Peer':
             peer_rows.append(out_row)
         out_row += 1
@@ -237,11 +286,6 @@ def build_cca(wb_src, wb_dst):
     ws[f'A{med_row}'].font = BOLD
 
     for col in ['Q', 'R', 'S', 'T', 'U', 'V']:
-    ws.cell(avg_row, 1, 'Average (peers only)').font = BOLD
-    ws.cell(med_row, 1, 'Median (peers only)').font = BOLD
-    peer_rng = f'Q{peer_rows[0]}:V{peer_rows[-1]}'
-
-    for idx, col in enumerate(['Q', 'R', 'S', 'T', 'U', 'V'], start=17):
         ws[f'{col}{avg_row}'] = f'=AVERAGEIF({col}{peer_rows[0]}:{col}{peer_rows[-1]},">0")'
         ws[f'{col}{med_row}'] = f'=MEDIAN(IF({col}{peer_rows[0]}:{col}{peer_rows[-1]}>0,{col}{peer_rows[0]}:{col}{peer_rows[-1]}))'
         ws[f'{col}{avg_row}'].font = BOLD
@@ -265,18 +309,10 @@ def build_cca(wb_src, wb_dst):
     )
     ws[f'H{qc_row + 1}'] = 'flags'
     ws[f'H{qc_row + 2}'] = 'flags'
-    ws[f'A{qc_row+1}'] = 'EV Bridge check (EV ≈ Market Cap + Net Debt)'
-    ws[f'A{qc_row+2}'] = 'Net debt check (Net Debt = Gross Debt - Cash)'
-
-    tolerance = 0.5
-    ws[f'G{qc_row+1}'] = f'=SUMPRODUCT(--(ABS(I{peer_rows[0]}:I{peer_rows[-1]}-(H{peer_rows[0]}:H{peer_rows[-1]}+J{peer_rows[0]}:J{peer_rows[-1]}))>{tolerance}))'
-    ws[f'G{qc_row+2}'] = f'=SUMPRODUCT(--(ABS(J{peer_rows[0]}:J{peer_rows[-1]}-(L{peer_rows[0]}:L{peer_rows[-1]}-M{peer_rows[0]}:M{peer_rows[-1]}))>{tolerance}))'
-    ws[f'H{qc_row+1}'] = 'flags'
-    ws[f'H{qc_row+2}'] = 'flags'
 
     for row in range(4, out_row):
         for col in ['A', 'B', 'C', 'D', 'E']:
-            ws[f'{col}{row}'].alignment = Alignment(horizontal='left')
+            ws[f'{col}{row}'].alignment = LEFT_ALIGN
         ws[f'F{row}'].number_format = '0.0000'
         ws[f'G{row}'].number_format = '0.00'
         for col in ['H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P']:
@@ -284,14 +320,11 @@ def build_cca(wb_src, wb_dst):
         for col in ['Q', 'R', 'S', 'T', 'U', 'V']:
             ws[f'{col}{row}'].number_format = '0.00x'
 
-    for col in ['R', 'S', 'U', 'V']:
-        ws.conditional_formatting.add(
-            f'{col}4:{col}{out_row - 1}',
-            CellIsRule(operator='lessThan', formula=['0'], fill=NEG_FILL),
-        )
-    # highlight negative EV/EBITDA or EV/EBIT multiples
-    for col in ['R', 'S', 'U', 'V']:
-        ws.conditional_formatting.add(f'{col}4:{col}{out_row-1}', CellIsRule(operator='lessThan', formula=['0'], fill=NEG_FILL))
+    # highlight negative EV/EBITDA or EV/EBIT multiples (one rule over both year blocks)
+    ws.conditional_formatting.add(
+        f'R4:S{out_row - 1} U4:V{out_row - 1}',
+        CellIsRule(operator='lessThan', formula=['0'], fill=NEG_FILL),
+    )
 
     apply_table_style(ws, 3, out_row - 1, 1, 22)
     apply_table_style(ws, avg_row, med_row, 1, 22)
@@ -301,10 +334,6 @@ def build_cca(wb_src, wb_dst):
         ws.column_dimensions[get_column_letter(i)].width = width
 
     return len(peer_rows), ws[f'G{qc_row + 1}'].value
-    for i, w in enumerate(widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = w
-
-    return len(peer_rows), ws[f'G{qc_row+1}'].value
 
 
 def build_peer_rationale(wb_src, wb_dst):
@@ -326,34 +355,26 @@ def build_peer_rationale(wb_src, wb_dst):
         c.border = BORDER
 
     source_map = {}
-    for r in range(22, src_sources.max_row + 1):
-        t = src_sources.cell(r, 2).value
+    for t, mcap, ev, nd in src_sources.iter_rows(min_row=22, min_col=2, max_col=5, values_only=True):
         if t:
-            source_map[t] = {
-                'mcap': src_sources.cell(r, 3).value,
-                'ev': src_sources.cell(r, 4).value,
-                'nd': src_sources.cell(r, 5).value,
-            }
+            source_map[t] = {'mcap': mcap, 'ev': ev, 'nd': nd}
 
     out = 5
-    for r in range(2, 11):
-        name = src_peer.cell(r, 1).value
-        ticker = src_peer.cell(r, 2).value
-        fit = src_peer.cell(r, 6).value
-        rationale = src_peer.cell(r, 7).value
+    for name, ticker, _, _, status, fit, rationale in src_peer.iter_rows(
+        min_row=2, max_row=10, max_col=7, values_only=True
+    ):
         src_note = source_map.get(ticker, {})
         source_text = (
             f"Price/Cap: {src_note.get('mcap', 'n/a')}; EV: {src_note.get('ev', 'n/a')}; "
             f"Net debt: {src_note.get('nd', 'n/a')}; Beta/Fundamentals as-of {asof}"
         )
-        source_text = f"Price/Cap/EV/ND: {src_note.get('mcap','n/a')}; EV: {src_note.get('ev','n/a')}; Net debt: {src_note.get('nd','n/a')}; Beta: Yahoo/peer model ({asof})"
 
         ws.cell(out, 1, name)
         ws.cell(out, 2, ticker)
         ws.cell(out, 3, fit)
         ws.cell(out, 4, rationale)
         ws.cell(out, 5, source_text)
-        if 'Excluded' in str(src_peer.cell(r, 5).value):
+        if 'Excluded' in str(status):
             ws.cell(out, 4).value = f"{rationale} (exclusion rationale retained from base model)."
         out += 1
 
@@ -364,7 +385,7 @@ def build_peer_rationale(wb_src, wb_dst):
         for c in range(1, 6):
             cell = ws.cell(r, c)
             cell.border = BORDER
-            cell.alignment = Alignment(vertical='top', wrap_text=True)
+            cell.alignment = WRAP_TOP_ALIGN
 
 
 def main():
@@ -377,13 +398,15 @@ def main():
     peer_count, ev_flags_formula = build_cca(wb_src, wb_dst)
     build_peer_rationale(wb_src, wb_dst)
 
+    wacc_values = evaluate_wacc(ws_wacc)
+
     wb_dst.save(DST)
+    write_cached_values(DST, wb_dst.sheetnames.index('WACC_Model') + 1, wacc_values)
 
-    # Re-open with data_only to capture cached numbers where available (formula result may be None until Excel recalc)
-    wb_check = openpyxl.load_workbook(DST, data_only=False)
-    wacc_val = wb_check['WACC_Model']['B25'].value
+    # Report from the in-memory workbook; openpyxl never evaluates formulas, so a reload adds nothing
+    wacc_val = wacc_values.get('B25', ws_wacc['B25'].value)
     print(f'Output path: {DST}')
-    print(f'Sheets included: {wb_check.sheetnames}')
+    print(f'Sheets included: {wb_dst.sheetnames}')
     print(f'Peer count included: {peer_count}')
     print(f'WACC value: {wacc_val}')
     print(f'Any EV bridge flags count: {ev_flags_formula}')
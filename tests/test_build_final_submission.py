@@ -0,0 +1,66 @@
+import shutil
+from pathlib import Path
+
+import openpyxl
+import pytest
+from openpyxl.cell._writer import etree_write_cell
+
+from scripts import build_final_submission
+
+SOURCE = Path(__file__).resolve().parents[1] / build_final_submission.SRC
+
+
+@pytest.fixture
+def source_workbook(monkeypatch, tmp_path):
+    """The committed submission workbook with one selected peer, so the WACC can be worked out by hand."""
+    monkeypatch.chdir(tmp_path)
+    build_final_submission.SRC.parent.mkdir()
+    shutil.copy(SOURCE, build_final_submission.SRC)
+
+    wb = openpyxl.load_workbook(build_final_submission.SRC)
+    ws = wb['WACC_Model']
+    for r in range(2, 11):
+        ws[f'B{r}'] = 1 if r == 2 else 0
+    ws['C2'], ws['D2'], ws['E2'] = 1.2, 100.0, 400.0
+    wb.save(build_final_submission.SRC)
+    return ws
+
+
+def expected_wacc(ws):
+    tax, target_de = build_final_submission.TAX_RATE, build_final_submission.TARGET_DE
+    unlevered = 1.2 / (1 + (1 - tax) * (100.0 / 400.0))
+    relevered = unlevered * (1 + (1 - tax) * target_de)
+    cost_of_equity = ws['B19'].value + relevered * 0.055 + ws['B21'].value
+    return cost_of_equity / (1 + target_de) + ws['B23'].value * (1 - tax) * target_de / (1 + target_de)
+
+
+@pytest.mark.parametrize('etree_writer', [False, True], ids=['lxml', 'etree'])
+def test_main_caches_wacc_for_data_only_readers(source_workbook, monkeypatch, etree_writer):
+    if etree_writer:
+        # openpyxl's fallback when lxml is missing writes empty values as <v/>
+        monkeypatch.setattr('openpyxl.worksheet._writer.write_cell', etree_write_cell)
+
+    build_final_submission.main()
+
+    ws = openpyxl.load_workbook(build_final_submission.DST, data_only=True)['WACC_Model']
+    assert ws['B25'].value == pytest.approx(expected_wacc(source_workbook))
+    assert ws['B14'].value == pytest.approx(1.2)
+    assert ws['G2'].value == pytest.approx(1.2 / (1 + 0.75 * 0.25))
+
+
+def test_formula_inputs_leave_wacc_uncached(source_workbook):
+    wb = openpyxl.load_workbook(build_final_submission.SRC)
+    wb['WACC_Model']['C2'] = '=1.1+0.1'
+    wb.save(build_final_submission.SRC)
+
+    build_final_submission.main()
+
+    ws = openpyxl.load_workbook(build_final_submission.DST, data_only=True)['WACC_Model']
+    assert ws['B25'].value is None
+
+
+def test_write_cached_values_rejects_cells_without_formula(source_workbook):
+    build_final_submission.main()
+
+    with pytest.raises(ValueError, match='A1'):
+        build_final_submission.write_cached_values(build_final_submission.DST, 1, {'A1': 1.0})
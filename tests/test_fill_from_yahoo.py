@@ -0,0 +1,186 @@
+import shelve
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from yfinance.exceptions import YFRateLimitError
+
+import build_peer_workbook
+import fill_from_yahoo
+
+
+class FakeTicker:
+    """Stands in for yf.Ticker; records every network-style call in the shared calls list."""
+
+    calls: list[tuple[str, str]] = []
+    failing: set[str] = set()
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def _call(self, what):
+        FakeTicker.calls.append((self.ticker, what))
+        if self.ticker in FakeTicker.failing:
+            raise RuntimeError("Yahoo unavailable")
+
+    def get_info(self):
+        self._call("get_info")
+        return {
+            "currency": "EUR",
+            "currentPrice": 10.0,
+            "marketCap": 1_000_000_000,
+            "enterpriseValue": 1_200_000_000,
+            "beta": 1.1,
+            "sharesOutstanding": 100_000_000,
+        }
+
+    @property
+    def financials(self):
+        self._call("financials")
+        columns = [pd.Timestamp("2024-12-31"), pd.Timestamp("2023-12-31")]
+        return pd.DataFrame(
+            {columns[0]: [500e6, 80e6, 60e6], columns[1]: [450e6, 70e6, 50e6]},
+            index=["Total Revenue", "EBITDA", "EBIT"],
+        )
+
+    @property
+    def balance_sheet(self):
+        self._call("balance_sheet")
+        return pd.DataFrame(
+            {pd.Timestamp("2024-12-31"): [300e6, 100e6]},
+            index=["Total Debt", "Cash And Cash Equivalents"],
+        )
+
+    def history(self, period):
+        self._call("history")
+        return pd.DataFrame()
+
+
+@pytest.fixture
+def fake_yf(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(fill_from_yahoo.YAHOO_REFRESH_ENV, raising=False)
+    monkeypatch.delenv(fill_from_yahoo.YAHOO_INCREMENTAL_ENV, raising=False)
+    monkeypatch.delenv(fill_from_yahoo.YAHOO_FX_ENV, raising=False)
+    monkeypatch.setattr(FakeTicker, "calls", [])
+    monkeypatch.setattr(FakeTicker, "failing", set())
+    monkeypatch.setattr(
+        fill_from_yahoo,
+        "yf",
+        SimpleNamespace(Ticker=FakeTicker, download=lambda *args, **kwargs: pd.DataFrame()),
+    )
+    return FakeTicker
+
+
+def _fetched(fake_yf, what="get_info"):
+    return sorted(ticker for ticker, call in fake_yf.calls if call == what)
+
+
+def test_fetch_all_ticker_data_uses_todays_cache(fake_yf):
+    first = fill_from_yahoo._fetch_all_ticker_data(["AALB.AS", "BSL.DE"])
+    assert _fetched(fake_yf) == ["AALB.AS", "BSL.DE"]
+
+    fake_yf.calls.clear()
+    second = fill_from_yahoo._fetch_all_ticker_data(["AALB.AS", "BSL.DE", "JEN.DE"])
+    assert _fetched(fake_yf) == ["JEN.DE"]
+    assert second["AALB.AS"][1] == first["AALB.AS"][1]
+    assert second["AALB.AS"][2].equals(first["AALB.AS"][2])
+
+
+def test_fetch_all_ticker_data_prunes_other_days(fake_yf):
+    with shelve.open(fill_from_yahoo.YAHOO_CACHE_FILE) as cache:
+        cache["AALB.AS:2000-01-01"] = ({"currency": "USD"}, pd.DataFrame(), pd.DataFrame())
+
+    result = fill_from_yahoo._fetch_all_ticker_data(["AALB.AS"])
+
+    assert _fetched(fake_yf) == ["AALB.AS"]
+    assert result["AALB.AS"][1]["currency"] == "EUR"
+    with shelve.open(fill_from_yahoo.YAHOO_CACHE_FILE) as cache:
+        assert sorted(cache) == [f"AALB.AS:{fill_from_yahoo._today().isoformat()}"]
+
+
+def test_fetch_all_ticker_data_refresh_bypasses_cache(fake_yf):
+    fill_from_yahoo._fetch_all_ticker_data(["AALB.AS"])
+    fake_yf.calls.clear()
+
+    fill_from_yahoo._fetch_all_ticker_data(["AALB.AS"], refresh=True)
+
+    assert _fetched(fake_yf) == ["AALB.AS"]
+
+
+def test_fetch_all_ticker_data_does_not_cache_partial_failures(fake_yf):
+    fake_yf.failing.add("BSL.DE")
+    fill_from_yahoo._fetch_all_ticker_data(["AALB.AS", "BSL.DE"])
+
+    fake_yf.failing.clear()
+    fake_yf.calls.clear()
+    fill_from_yahoo._fetch_all_ticker_data(["AALB.AS", "BSL.DE"])
+
+    assert _fetched(fake_yf) == ["BSL.DE"]
+
+
+def test_rate_limit_retry_gives_up_after_max_attempts(monkeypatch):
+    delays = []
+    monkeypatch.setattr(fill_from_yahoo.time, "sleep", delays.append)
+    attempts = []
+
+    def fetch():
+        attempts.append(1)
+        raise YFRateLimitError()
+
+    with pytest.raises(YFRateLimitError):
+        fill_from_yahoo._with_rate_limit_retry(fetch, "AALB.AS get_info")
+
+    assert len(attempts) == fill_from_yahoo.RATE_LIMIT_ATTEMPTS
+    assert len(delays) == fill_from_yahoo.RATE_LIMIT_ATTEMPTS - 1
+    assert delays == sorted(delays)
+
+
+def test_rate_limit_retry_returns_after_recovery(monkeypatch):
+    monkeypatch.setattr(fill_from_yahoo.time, "sleep", lambda delay: None)
+    responses = iter([YFRateLimitError(), {"currency": "EUR"}])
+
+    def fetch():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert fill_from_yahoo._with_rate_limit_retry(fetch, "AALB.AS get_info") == {"currency": "EUR"}
+
+
+def test_incremental_run_skips_filled_rows_and_restores_fill(fake_yf, monkeypatch):
+    build_peer_workbook.main()
+    fake_yf.failing.add("BSL.DE")
+    fill_from_yahoo.main()
+
+    ws = load_workbook(fill_from_yahoo.OUTPUT_FILE)[fill_from_yahoo.SHEET_NAME]
+    base_cols, group_cols = fill_from_yahoo._build_header_maps(ws)
+    rows = {raw: row for row, raw, _ in fill_from_yahoo._collect_peer_rows(ws, base_cols["Ticker"])}
+    revenue_col = group_cols[("Revenue (CCY m)", "2024")]
+    assert ws.cell(rows["BSL.DE"], base_cols["Currency"]).value is None
+    assert ws.cell(rows["BSL.DE"], revenue_col).fill.fgColor.rgb.endswith("FFF2CC")
+
+    fake_yf.failing.clear()
+    fake_yf.calls.clear()
+    monkeypatch.setenv(fill_from_yahoo.YAHOO_INCREMENTAL_ENV, "1")
+    fill_from_yahoo.main()
+
+    # Complete rows are kept; TWEKA.AS still comes from today's cache for the TKH inputs block.
+    assert _fetched(fake_yf) == ["BSL.DE"]
+    ws = load_workbook(fill_from_yahoo.OUTPUT_FILE)[fill_from_yahoo.SHEET_NAME]
+    assert ws.cell(rows["BSL.DE"], base_cols["Currency"]).value == "EUR"
+    assert ws.cell(rows["BSL.DE"], revenue_col).value == pytest.approx(500.0)
+    assert ws.cell(rows["BSL.DE"], revenue_col).fill.fgColor.rgb.endswith("E2F0D9")
+    assert ws.cell(rows["AALB.AS"], revenue_col).value == pytest.approx(500.0)
+
+
+@pytest.mark.parametrize("value", [1, 1.0, True, "1", " 1 "])
+def test_is_selected_accepts_saved_variants(value):
+    assert fill_from_yahoo._is_selected(value)
+
+
+@pytest.mark.parametrize("value", [0, 0.0, False, None, "", "yes"])
+def test_is_selected_rejects_other_values(value):
+    assert not fill_from_yahoo._is_selected(value)